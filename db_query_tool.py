@@ -1,6 +1,7 @@
 import sqlite3
 import pandas as pd
 from tabulate import tabulate
+from tdx_export import export_query
 
 class NewsQueryTool:
     def __init__(self, db_path='news_data.db'):
@@ -71,12 +72,10 @@ class NewsQueryTool:
         return df
     
     def export_to_csv(self, filename='news_export.csv'):
-        """导出数据到CSV"""
-        query = "SELECT * FROM news_announcements"
-        df = pd.read_sql_query(query, self.conn)
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
-        print(f"✅ 数据已导出到: {filename}")
-        return df
+        """导出数据到CSV（按块流式写出；.ndjson 或 .gz 结尾时导出对应格式）"""
+        count = export_query(self.conn, "SELECT * FROM news_announcements", filename)
+        print(f"✅ 数据已导出到: {filename}（{count} 条）")
+        return count
     
     def show_summary(self):
         """显示数据摘要"""
@@ -8,11 +8,17 @@ import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
-from tdx_all_news_crawler import TDXAllNewsCrawler
-import sqlite3
-import pandas as pd
+from tdx_all_news_crawler import TDXAllNewsCrawler, snapshot_path_for
+import json
+import gzip
+import hashlib
+from tdx_export import NEWS_COLUMNS, export_news
+from tdx_issue_time import issue_day_sql, to_issue_ts
 from datetime import datetime
 
+# 网站使用的按天JSON分片目录
+SHARD_DIR = 'news_shards'
+
 def main():
     print("🚀 GitHub Actions新闻爬虫启动")
     print(f"⏰ 当前时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -29,32 +35,29 @@ def main():
         # 创建数据库连接（增量更新模式）
         conn = crawler.create_database('tdx_all_news.db')
         
-        # 获取新闻数据（获取前3页，每页50条）
-        all_data = []
-        for page in range(1, 4):
-            page_data = crawler.fetch_page_data(page, 50)
-            if page_data:
-                all_data.append(page_data)
-                print(f"✅ 第{page}页获取成功")
-            else:
-                print(f"❌ 第{page}页获取失败")
-                break
-        
-        if all_data:
-            # 增量保存数据到数据库（避免重复）
-            saved_count = crawler.save_all_data(conn, all_data)
+        # 增量获取上次入库之后的新数据（按水位线翻页，不重复下载已存储记录）
+        watermark = crawler.get_watermark(conn)
+        all_data = crawler.fetch_incremental_news(watermark, page_size=50)
+        
+        if all_data is None:
+            print("❌ 未能获取到数据")
+        else:
+            # 增量保存数据到数据库
+            saved_count = crawler.save_all_data(conn, all_data) if all_data else 0
             print(f"✅ 成功保存 {saved_count} 条数据到数据库（增量更新）")
             
+            # 有新数据时发布只读快照，API切换到新快照读取
+            if saved_count:
+                crawler.publish_snapshot(conn, snapshot_path_for('tdx_all_news.db'))
+            
             # 导出为CSV文件
             export_to_csv(conn)
             
-            # 导出为JSON文件供网站使用
+            # 导出按天JSON分片供网站使用（只重写有新数据的日期）
             export_to_json(conn)
             
             # 显示统计信息
             show_statistics(conn)
-        else:
-            print("❌ 未能获取到任何数据")
         
         conn.close()
         print("\n🎉 GitHub Actions爬虫任务完成!")
@@ -65,66 +68,125 @@ def main():
         return 1
 
 def export_to_csv(conn):
-    """导出数据库为CSV文件"""
+    """导出数据库为CSV文件（按块流式写出）
+    
+    tdx_all_news_export.csv 是已发布的数据文件，沿用英文列名作为表头，下游读取不受影响。
+    """
     try:
-        cursor = conn.cursor()
-        cursor.execute('''
-        SELECT position, record_id, title, issue_date, summary, source, 
-               stock_code, stock_name, relate_id, proc_id, mark_id
-        FROM all_stock_news 
-        ORDER BY issue_date DESC
-        ''')
-        
-        # 获取列名
-        columns = [description[0] for description in cursor.description]
-        data = cursor.fetchall()
-        
-        # 创建DataFrame并导出
-        df = pd.DataFrame(data, columns=columns)
-        df.to_csv('tdx_all_news_export.csv', index=False, encoding='utf-8-sig')
-        print(f"📄 数据已导出到CSV文件，共 {len(df)} 条记录")
+        count = export_news(conn, 'tdx_all_news_export.csv',
+                            headers=[column for column, _ in NEWS_COLUMNS])
+        print(f"📄 数据已导出到CSV文件，共 {count} 条记录")
         
     except Exception as e:
         print(f"❌ CSV导出失败: {e}")
 
-def export_to_json(conn):
-    """导出数据库为JSON文件供网站使用"""
+def write_day_shard(cursor, out_dir, day, previous=None):
+    """导出一天的JSON分片及其 .gz 压缩版本，内容未变时不重写文件，返回清单条目"""
+    cursor.execute('''
+    SELECT record_id, title, issue_date, summary, source, mark_id
+    FROM all_stock_news
+    WHERE issue_ts >= ? AND issue_ts < ?
+    ORDER BY issue_ts DESC, record_id DESC
+    ''', (to_issue_ts(day), to_issue_ts(day, end=True)))
+    
+    # 转换为网站需要的格式
+    news_list = []
+    for record in cursor.fetchall():
+        news_list.append({
+            'id': record[0],
+            'title': record[1],
+            'date': record[2],
+            'time': record[2].split(' ')[1] if record[2] and ' ' in record[2] else '--:--:--',
+            'content': record[3] or record[1],
+            'source': record[4] or '未知来源',
+            'highlight': record[5] == 1
+        })
+    
+    # 紧凑且不含时间戳，同样的数据总是得到同样的字节，git 不会产生无意义的提交
+    body = json.dumps({
+        'success': True,
+        'date': day,
+        'count': len(news_list),
+        'data': news_list
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()
+    
+    entry = {
+        'date': day,
+        'count': len(news_list),
+        'sha256': digest,
+        'file': f'days/{day}.json',
+        'gz': f'days/{day}.json.gz',
+        'bytes': len(body),
+    }
+    
+    if previous and previous['sha256'] == digest and os.path.exists(os.path.join(out_dir, entry['gz'])):
+        entry['gz_bytes'] = previous['gz_bytes']
+        return entry
+    
+    compressed = gzip.compress(body, mtime=0)
+    entry['gz_bytes'] = len(compressed)
+    with open(os.path.join(out_dir, entry['file']), 'wb') as f:
+        f.write(body)
+    with open(os.path.join(out_dir, entry['gz']), 'wb') as f:
+        f.write(compressed)
+    return entry
+
+def export_to_json(conn, out_dir=SHARD_DIR):
+    """按发布日期导出JSON分片供网站使用
+    
+    每天一个 days/YYYY-MM-DD.json 及预压缩的 .json.gz；manifest.json 记录各分片的条数、
+    大小和sha256，以及已导出的最大行id，下次只重写该id之后入库的记录所在的日期。
+    """
     try:
+        manifest_path = os.path.join(out_dir, 'manifest.json')
+        manifest = {'max_id': 0, 'days': []}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        shards = {entry['date']: entry for entry in manifest['days']}
+        
         cursor = conn.cursor()
-        cursor.execute('''
-        SELECT record_id, title, issue_date, summary, source, mark_id
-        FROM all_stock_news 
-        ORDER BY issue_date DESC
-        ''')
-        
-        data = cursor.fetchall()
-        
-        # 转换为网站需要的格式
-        news_list = []
-        for record in data:
-            news_list.append({
-                'id': record[0],
-                'title': record[1],
-                'date': record[2],
-                'time': record[2].split(' ')[1] if record[2] and ' ' in record[2] else '--:--:--',
-                'content': record[3] or record[1],
-                'source': record[4] or '未知来源',
-                'highlight': record[5] == 1
-            })
-        
-        # 生成JSON文件
-        import json
-        json_data = {
-            'success': True,
-            'data': news_list,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'count': len(news_list)
-        }
-        
-        with open('latest_news.json', 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"📄 数据已导出到JSON文件，共 {len(news_list)} 条记录（包含所有历史数据）")
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM all_stock_news')
+        max_id = cursor.fetchone()[0]
+        
+        # 上次导出后新入库的记录涉及的日期（由 issue_ts 换算，与分片的时间范围一致；无法解析的时间为0，跳过）
+        cursor.execute(f'''
+        SELECT DISTINCT {issue_day_sql('issue_ts')}
+        FROM all_stock_news
+        WHERE id > ? AND issue_ts > 0
+        ''', (manifest['max_id'],))
+        dirty_days = {row[0] for row in cursor.fetchall()}
+        
+        # 分片文件丢失时重新生成
+        dirty_days |= {day for day, entry in shards.items()
+                       if not os.path.exists(os.path.join(out_dir, entry['file']))}
+        
+        os.makedirs(os.path.join(out_dir, 'days'), exist_ok=True)
+        changed_days = []
+        for day in sorted(dirty_days):
+            try:
+                entry = write_day_shard(cursor, out_dir, day, shards.get(day))
+            except ValueError:
+                print(f"⚠️ 跳过无法识别的日期: {day}")
+                continue
+            if shards.get(day, {}).get('sha256') != entry['sha256']:
+                changed_days.append(day)
+            shards[day] = entry
+        
+        if changed_days or max_id != manifest['max_id'] or not os.path.exists(manifest_path):
+            days = sorted(shards.values(), key=lambda entry: entry['date'], reverse=True)
+            manifest = {
+                'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'max_id': max_id,
+                'total': sum(entry['count'] for entry in days),
+                'days': days
+            }
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+        
+        print(f"📄 JSON分片导出完成: 共 {len(shards)} 天，本次更新 {len(changed_days)} 天"
+              f"{'（' + ', '.join(changed_days[-5:]) + '）' if changed_days else ''}")
         
     except Exception as e:
         print(f"❌ JSON导出失败: {e}")
@@ -134,16 +196,12 @@ def show_statistics(conn):
     try:
         cursor = conn.cursor()
         
-        # 总记录数
-        cursor.execute("SELECT COUNT(*) FROM all_stock_news")
-        total_count = cursor.fetchone()[0]
-        
-        # 最新记录时间
-        cursor.execute("SELECT MAX(issue_date) FROM all_stock_news")
-        latest_date = cursor.fetchone()[0]
+        # 总记录数与最新记录时间（增量维护的汇总表）
+        cursor.execute("SELECT total_count, max_issue_date FROM news_summary WHERE id = 1")
+        total_count, latest_date = cursor.fetchone()
         
         # 来源统计
-        cursor.execute("SELECT source, COUNT(*) FROM all_stock_news GROUP BY source ORDER BY COUNT(*) DESC LIMIT 5")
+        cursor.execute("SELECT source, count FROM source_stats ORDER BY count DESC LIMIT 5")
         top_sources = cursor.fetchall()
         
         print(f"\n📊 数据库统计:")
@@ -4,6 +4,7 @@ import sqlite3
 from urllib.parse import urlencode
 import time
 from datetime import datetime
+from tdx_stocks import extract_stock_info
 
 class NewsCrawler:
     def __init__(self, db_path='news_data.db'):
@@ -49,17 +50,7 @@ class NewsCrawler:
     
     def extract_stock_info(self, title):
         """从标题中提取股票代码和名称"""
-        import re
-        
-        # 匹配模式: 股票名称(代码):公告标题
-        pattern = r'(.+?)\((\d{6})\):'
-        match = re.search(pattern, title)
-        
-        if match:
-            stock_name = match.group(1).strip()
-            stock_code = match.group(2)
-            return stock_code, stock_name
-        return None, None
+        return extract_stock_info(title)
     
     def fetch_news_data(self):
         """从API获取新闻数据"""
@@ -1,8 +1,8 @@
 import json
 import sqlite3
 import pandas as pd
-import re
 from datetime import datetime
+from tdx_stocks import extract_stock_info
 
 # 您提供的真实API响应数据
 real_response = {
@@ -109,17 +109,6 @@ def create_database():
     conn.commit()
     return conn
 
-def extract_stock_info(title):
-    """从标题中提取股票代码和名称"""
-    # 匹配模式：股票名称(股票代码)
-    pattern = r'([^\(]+)\((\d{6})\)'
-    match = re.search(pattern, title)
-    if match:
-        stock_name = match.group(1).strip()
-        stock_code = match.group(2)
-        return stock_code, stock_name
-    return None, None
-
 def process_and_save_data(conn):
     """处理数据并保存到数据库"""
     cursor = conn.cursor()
@@ -1,7 +1,7 @@
 import sqlite3
-import re
 import json
 from datetime import datetime
+from tdx_stocks import extract_stock_info
 
 class RealDataProcessor:
     def __init__(self):
@@ -110,13 +110,7 @@ class RealDataProcessor:
     
     def extract_stock_info(self, title):
         """从标题中提取股票代码和名称"""
-        pattern = r'([^\(]+)\((\d{6})\)'
-        match = re.search(pattern, title)
-        if match:
-            stock_name = match.group(1).strip()
-            stock_code = match.group(2)
-            return stock_code, stock_name
-        return None, None
+        return extract_stock_info(title)
     
     def process_and_save_data(self):
         """处理并保存数据"""
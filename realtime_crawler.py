@@ -2,8 +2,8 @@ import requests
 import sqlite3
 import json
 import time
-import re
 from datetime import datetime
+from tdx_stocks import extract_stock_info
 
 class TDXCrawler:
     def __init__(self):
@@ -107,13 +107,7 @@ class TDXCrawler:
     
     def extract_stock_info(self, title):
         """从标题中提取股票代码和名称"""
-        pattern = r'([^\(]+)\((\d{6})\)'
-        match = re.search(pattern, title)
-        if match:
-            stock_name = match.group(1).strip()
-            stock_code = match.group(2)
-            return stock_code, stock_name
-        return None, None
+        return extract_stock_info(title)
     
     def save_to_database(self, conn, data):
         """保存数据到数据库"""
@@ -1,11 +1,137 @@
 import json
+import math
+import time
+import random
+import hashlib
+import argparse
 import http.server
+import threading
 import socketserver
+from collections import OrderedDict
+from datetime import datetime
 from urllib.parse import urlparse, parse_qs
 
+COL_NAMES = ["pos", "rec_id", "title", "issue_date", "summary", "src_info", "relate_id", "Proc_Id", "Mark_Id"]
+
+class SyntheticNewsStore:
+    """按需生成的合成公告数据
+    
+    第 i 条记录（从旧到新）的 rec_id 为 base_rec_id + i，单调递增；记录均匀分布在截至
+    end_date 的 days 天内，每条在请求时由序号推导生成，数据量再大也不占内存。
+    arrival_rate 大于0时，最新一天会按该速率（条/秒）持续产生新公告。
+    shuffle_window 大于1时模拟真实接口：列表按发布时间排列，每 shuffle_window 条记录为一个时间窗口，
+    窗口内 rec_id 的先后被打乱（新到达的公告可能排在同一窗口内较旧的公告之后）。
+    """
+    NAME_PREFIXES = ['华', '中', '东', '新', '金', '宏', '长', '海', '天', '国', '恒', '永']
+    NAME_MIDDLES = ['科', '信', '泰', '远', '达', '丰', '安', '联', '通', '盛', '源', '瑞']
+    NAME_SUFFIXES = ['股份', '科技', '电子', '药业', '能源', '传媒', '银行', '证券', '材料', '智能']
+    # (代码前缀, 来源)
+    MARKETS = [('600', '上交所'), ('688', '上交所'), ('000', '深交所'), ('300', '深交所'), ('830', '北交所')]
+    ANNOUNCEMENTS = [
+        '关于召开2025年第二次临时股东大会的通知',
+        '第三届董事会第十二次会议决议公告',
+        '关于股东减持股份的预披露公告',
+        '关于获得政府补助的公告',
+        '2025年半年度报告摘要',
+        '关于回购公司股份的进展公告',
+        '关于变更参股公司董事、监事委派人员的自愿性信息披露公告',
+        '关于使用闲置募集资金进行现金管理的公告',
+    ]
+    NEWS_SOURCES = ['财联社', '格隆汇', '智通财经']
+    NEWS_HEADLINES = [
+        'A股三大指数集体收涨，成交额超万亿',
+        '央行开展逆回购操作，利率保持不变',
+        '北向资金全天净买入超50亿元',
+        '新能源板块持续走强，多只个股涨停',
+    ]
+    
+    def __init__(self, total=1_000_000, days=365, end_date=None, base_rec_id=5_000_000,
+                 companies=5000, arrival_rate=0.0, shuffle_window=0):
+        self.total = total
+        self.shuffle_window = shuffle_window
+        self.days = max(1, days)
+        self.end_date = (end_date or datetime.now()).date()
+        self.base_rec_id = base_rec_id
+        self.arrival_rate = arrival_rate
+        self.per_day = max(1, total // self.days)
+        self.started = time.monotonic()
+        self.companies = [self._make_company(j) for j in range(companies)]
+    
+    def _make_company(self, j):
+        prefix, source = self.MARKETS[j % len(self.MARKETS)]
+        code = f"{prefix}{(j // len(self.MARKETS)) % 1000:03d}"
+        name = (self.NAME_PREFIXES[j % len(self.NAME_PREFIXES)]
+                + self.NAME_MIDDLES[(j // 7) % len(self.NAME_MIDDLES)]
+                + self.NAME_SUFFIXES[(j // 11) % len(self.NAME_SUFFIXES)])
+        return name, code, source
+    
+    def current_total(self):
+        """当前记录总数（含模拟新到达的公告）"""
+        arrived = int((time.monotonic() - self.started) * self.arrival_rate)
+        return self.total + arrived
+    
+    def day_range(self, day):
+        """某天记录的序号区间 [start, end)，该天无数据时返回 None"""
+        offset = (day - self.end_date).days + self.days - 1
+        if offset < 0 or offset >= self.days:
+            return None
+        start = offset * self.per_day
+        end = self.current_total() if offset == self.days - 1 else start + self.per_day
+        return start, end
+    
+    def display_index(self, slot, day_start, day_end):
+        """列表中第 slot 个位置（从旧到新）对应的记录序号；打乱时在所在时间窗口内置换"""
+        window = self.shuffle_window
+        if window <= 1:
+            return slot
+        low = max(day_start, slot - slot % window)
+        size = min(day_end, slot - slot % window + window) - low
+        step = next((k for k in (7, 11, 13, 17, 19, 23) if math.gcd(k, size) == 1), 1)
+        return low + (slot - low) * step % size
+    
+    def make_row(self, index, pos, day, day_start, slot=None):
+        """由序号生成一行数据（slot 为列表位置，决定发布时间，默认与序号相同）"""
+        slot = index if slot is None else slot
+        # 公告时间在当天 07:00~22:00 之间按位置递增分布，新到达的公告顺延至午夜前
+        second = min(7 * 3600 + (slot - day_start) * (15 * 3600) // self.per_day, 86399)
+        issue_date = f"{day:%Y-%m-%d} {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+        
+        mixed = (index * 2654435761) & 0xFFFFFFFF
+        if mixed % 5 == 0:
+            title = self.NEWS_HEADLINES[mixed % len(self.NEWS_HEADLINES)]
+            source = self.NEWS_SOURCES[mixed % len(self.NEWS_SOURCES)]
+        else:
+            name, code, source = self.companies[mixed % len(self.companies)]
+            title = f"{name}({code}):{self.ANNOUNCEMENTS[mixed % len(self.ANNOUNCEMENTS)]}"
+        
+        return [pos, self.base_rec_id + index, title, issue_date, title, source,
+                20000000 + index, 0, 1 if index % 3 == 0 else 0]
+    
+    def query(self, day, page, page_size):
+        """按日期分页查询，按发布时间从新到旧返回 (行列表, 当天记录数)"""
+        bounds = self.day_range(day)
+        if bounds is None:
+            return [], 0
+        day_start, day_end = bounds
+        high = day_end - (page - 1) * page_size
+        low = max(day_start, high - page_size)
+        rows = [
+            self.make_row(self.display_index(slot, day_start, day_end), pos, day, day_start, slot)
+            for pos, slot in enumerate(range(high - 1, low - 1, -1), 1)
+        ]
+        return rows, day_end - day_start
+
 class TDXAPIHandler(http.server.SimpleHTTPRequestHandler):
     """同花顺API模拟器"""
     
+    # 支持keep-alive长连接
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
     def do_POST(self):
         """处理POST请求"""
         if self.path.startswith('/TQLEX'):
@@ -13,6 +139,25 @@ class TDXAPIHandler(http.server.SimpleHTTPRequestHandler):
         else:
             self.send_error(404, "API not found")
     
+    def send_json(self, body):
+        """发送JSON响应"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_truncated(self, body, fraction=0.7):
+        """声明完整长度但只发送部分响应体后断开，模拟传输中途连接中断"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[:int(len(body) * fraction)])
+        self.wfile.flush()
+        self.close_connection = True
+    
     def handle_tqlex_api(self):
         """处理TQLEX API请求"""
         try:
@@ -20,86 +165,75 @@ class TDXAPIHandler(http.server.SimpleHTTPRequestHandler):
             content_length = int(self.headers.get('Content-Length', 0))
             post_data = self.rfile.read(content_length).decode('utf-8')
             params = parse_qs(post_data)
+            query = parse_qs(urlparse(self.path).query)
             
-            # 检查Entry参数
-            entry = params.get('Entry', [''])[0]
+            # 检查Entry参数（爬虫放在URL中，测试客户端放在表单中）
+            entry = query.get('Entry', params.get('Entry', ['']))[0]
             
-            if entry == 'CWServ.tdxzb_zxts_ywbb':
-                # 返回成功的响应数据
-                success_response = {
-                    "HitCache": "L1:B1FB6080A43E",
-                    "ErrorCode": 0,
-                    "ResultSets": [
-                        {
-                            "ColName": [
-                                "pos",
-                                "rec_id", 
-                                "title",
-                                "issue_date",
-                                "summary",
-                                "src_info",
-                                "relate_id",
-                                "Proc_Id",
-                                "Mark_Id"
-                            ],
-                            "Content": [
-                                [
-                                    1,
-                                    5549513,
-                                    "*ST金比(002762):关于变更参股公司董事、监事委派人员的自愿性信息披露公告",
-                                    "2025-09-24 17:57:00",
-                                    "*ST金比(002762):关于变更参股公司董事、监事委派人员的自愿性信息披露公告",
-                                    "深交所",
-                                    20009684,
-                                    0,
-                                    1
-                                ],
-                                [
-                                    2,
-                                    5549507,
-                                    "蓝特光学(688127):2025年第二次临时股东大会决议公告",
-                                    "2025-09-24 17:57:00",
-                                    "蓝特光学(688127):2025年第二次临时股东大会决议公告",
-                                    "上交所",
-                                    20009678,
-                                    0,
-                                    1
-                                ],
-                                [
-                                    3,
-                                    5549506,
-                                    "蓝特光学(688127):2025年第二次临时股东大会的法律意见书",
-                                    "2025-09-24 17:57:00",
-                                    "蓝特光学(688127):2025年第二次临时股东大会的法律意见书",
-                                    "上交所",
-                                    20009677,
-                                    0,
-                                    1
-                                ]
-                            ]
-                        }
-                    ]
-                }
-                
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                
-                response_json = json.dumps(success_response, ensure_ascii=False)
-                self.wfile.write(response_json.encode('utf-8'))
-                
-            else:
+            server = self.server
+            
+            # 模拟网络延迟
+            delay = server.latency + server.random.uniform(0, server.jitter)
+            if delay:
+                time.sleep(delay)
+            
+            if entry != 'CWServ.tdxzb_zxts_ywbb':
                 # 参数错误
                 error_response = {
                     "ErrorCode": -1002,
                     "ErrorInfo": "请求参数错误"
                 }
-                
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.end_headers()
-                self.wfile.write(json.dumps(error_response).encode('utf-8'))
+                self.send_json(json.dumps(error_response).encode('utf-8'))
+                return
+            
+            # 模拟服务端故障
+            if server.random.random() < server.error_rate:
+                if server.random.random() < 0.5:
+                    self.send_error(503, "Service Unavailable")
+                else:
+                    error_response = {"ErrorCode": -1, "ErrorInfo": "服务器繁忙"}
+                    self.send_json(json.dumps(error_response, ensure_ascii=False).encode('utf-8'))
+                return
+            
+            # 解析TQLEX参数: [日期, "", 页码, 每页数量, "0"]
+            try:
+                tqlex_params = json.loads(post_data).get('Params', [])
+            except (json.JSONDecodeError, AttributeError):
+                tqlex_params = []
+            query_date = tqlex_params[0] if len(tqlex_params) > 0 and tqlex_params[0] else None
+            page = int(tqlex_params[2]) if len(tqlex_params) > 2 else 1
+            page_size = int(tqlex_params[3]) if len(tqlex_params) > 3 else 50
+            day = datetime.strptime(query_date[:10], '%Y-%m-%d').date() if query_date else server.store.end_date
+            
+            cache_key = (day, page, page_size)
+            
+            # 模拟服务端缓存：按概率返回上一次的（可能已过期的）相同响应
+            if server.stale_rate > 0:
+                cached = server.cached_response(cache_key)
+                if cached and server.random.random() < server.stale_rate:
+                    self.send_json(cached)
+                    return
+            
+            rows, day_count = server.store.query(day, max(page, 1), max(page_size, 1))
+            digest = hashlib.md5(f"{cache_key}|{day_count}".encode('utf-8')).hexdigest()[:12].upper()
+            success_response = {
+                "HitCache": f"L1:{digest}",
+                "ErrorCode": 0,
+                "ResultSets": [
+                    {
+                        "ColName": COL_NAMES,
+                        "Content": rows
+                    }
+                ]
+            }
+            
+            response_body = json.dumps(success_response, ensure_ascii=False).encode('utf-8')
+            if server.stale_rate > 0:
+                server.cache_response(cache_key, response_body)
+            if server.truncate_rate and server.random.random() < server.truncate_rate:
+                self.send_truncated(response_body)
+                return
+            self.send_json(response_body)
                 
         except Exception as e:
             self.send_error(500, f"Server error: {str(e)}")
@@ -110,19 +244,58 @@ class TDXAPIHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, GET, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
-def run_simulator(port=8000):
+class TDXSimulatorServer(socketserver.ThreadingTCPServer):
+    """多线程模拟服务器，可注入延迟、错误、重复的HitCache响应和中途断开的响应"""
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = 128
+    # 模拟服务端缓存最多保留的响应数（按最近使用淘汰），只在 stale_rate > 0 时使用
+    RESPONSE_CACHE_SIZE = 256
+    
+    def __init__(self, address, latency=0.0, verbose=True, store=None, jitter=0.0,
+                 error_rate=0.0, stale_rate=0.0, seed=None, truncate_rate=0.0):
+        super().__init__(address, TDXAPIHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stale_rate = stale_rate
+        self.truncate_rate = truncate_rate
+        self.verbose = verbose
+        self.store = store or SyntheticNewsStore()
+        self.random = random.Random(seed)
+        self.response_cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+    
+    def cached_response(self, key):
+        with self.cache_lock:
+            body = self.response_cache.get(key)
+            if body is not None:
+                self.response_cache.move_to_end(key)
+            return body
+    
+    def cache_response(self, key, body):
+        with self.cache_lock:
+            self.response_cache[key] = body
+            self.response_cache.move_to_end(key)
+            while len(self.response_cache) > self.RESPONSE_CACHE_SIZE:
+                self.response_cache.popitem(last=False)
+
+def run_simulator(port=8000, latency=0.0, **options):
     """运行API模拟器"""
     print("🚀 启动同花顺API模拟器")
     print(f"📡 服务地址: http://localhost:{port}")
     print("🔧 支持的API:")
     print("   POST /TQLEX?Entry=CWServ.tdxzb_zxts_ywbb")
     print("   Content-Type: application/x-www-form-urlencoded")
-    print("📊 返回模拟的股票公告数据")
+    print("📊 返回按日期分页的合成股票公告数据")
     print("⏹️ 按 Ctrl+C 停止服务")
     
-    with socketserver.TCPServer(("", port), TDXAPIHandler) as httpd:
+    with TDXSimulatorServer(("", port), latency=latency, **options) as httpd:
+        store = httpd.store
+        print(f"📚 数据规模: {store.total} 条，{store.days} 天，rec_id {store.base_rec_id} 起")
         print(f"✅ 服务已启动在端口 {port}")
         httpd.serve_forever()
 
@@ -152,12 +325,36 @@ except Exception as e:
     print("✅ 测试客户端已创建: test_api_client.py")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="同花顺TQLEX接口模拟器")
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    parser.add_argument('--total', type=int, default=1_000_000, help='合成公告总数')
+    parser.add_argument('--days', type=int, default=365, help='数据覆盖天数')
+    parser.add_argument('--arrival-rate', type=float, default=0.0, help='新公告到达速率（条/秒）')
+    parser.add_argument('--shuffle-window', type=int, default=0, help='按发布时间排列时打乱 rec_id 的窗口大小（条）')
+    parser.add_argument('--latency', type=float, default=0.0, help='固定响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机附加延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='错误响应概率')
+    parser.add_argument('--stale-rate', type=float, default=0.0, help='返回重复HitCache旧响应的概率')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='响应体发送到70%%时断开连接的概率')
+    parser.add_argument('--quiet', action='store_true', help='不输出请求日志')
+    args = parser.parse_args()
+    
     # 创建测试客户端
     create_test_client()
     
     # 启动模拟器
     try:
-        run_simulator()
+        run_simulator(
+            port=args.port,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            stale_rate=args.stale_rate,
+            truncate_rate=args.truncate_rate,
+            verbose=not args.quiet,
+            store=SyntheticNewsStore(total=args.total, days=args.days, arrival_rate=args.arrival_rate,
+                                     shuffle_window=args.shuffle_window)
+        )
     except KeyboardInterrupt:
         print("\n🛑 服务已停止")
     except Exception as e:
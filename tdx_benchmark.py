@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+爬虫性能基准测试
+基于本地 tdx_api_simulator.py 模拟器，无需访问真实接口
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import threading
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from tdx_all_news_crawler import TDXAllNewsCrawler, ResultSetStream
+from tdx_api_simulator import TDXSimulatorServer, SyntheticNewsStore
+from tdx_pipeline import IngestPipeline
+from tdx_stocks import extract_stocks_batch
+
+def start_simulator(latency=0.08, **options):
+    """在后台线程启动模拟器，返回 (server, base_url)"""
+    server = TDXSimulatorServer(("127.0.0.1", 0), latency=latency, verbose=False, **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+def bench_fetch(concurrency_levels=(1, 4, 16), max_pages=48, page_size=50, latency=0.08):
+    """测量不同并发数下 fetch_all_news 的页/秒"""
+    server, base_url = start_simulator(latency)
+
+    print(f"📊 分页抓取基准: {max_pages}页，模拟延迟 {latency * 1000:.0f}ms")
+    results = []
+    try:
+        for concurrency in concurrency_levels:
+            crawler = TDXAllNewsCrawler(base_url=base_url)
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                all_data = crawler.fetch_all_news(
+                    max_pages=max_pages,
+                    page_size=page_size,
+                    concurrency=concurrency,
+                    host_rps=None
+                )
+            elapsed = time.perf_counter() - start
+            pages_per_sec = len(all_data) / elapsed
+            results.append((concurrency, len(all_data), elapsed, pages_per_sec))
+            print(f"   并发 {concurrency:>2}: {len(all_data)} 页，耗时 {elapsed:.2f}s，{pages_per_sec:.1f} 页/秒")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return results
+
+COL_NAMES = ["pos", "rec_id", "title", "issue_date", "summary", "src_info", "relate_id", "Proc_Id", "Mark_Id"]
+
+def bench_incremental(initial_rows=2000, bursts=(15, 50, 7, 180, 33, 480), page_size=50, shuffle_window=20):
+    """增量轮询：列表按发布时间排列、rec_id 在时间窗口内乱序时，每批新公告都应全部入库
+
+    15 条之后再到达 50 条时，新旧记录所在的时间窗口跨越第1、2页的边界，部分新记录排在第2页，
+    在第1页遇到旧记录即停止的实现会漏掉它们。
+    """
+    end_date = datetime.now()
+    store = SyntheticNewsStore(total=initial_rows, days=1, end_date=end_date, shuffle_window=shuffle_window)
+    server, base_url = start_simulator(0.0, store=store)
+
+    print(f"📊 增量轮询基准: 初始 {initial_rows:,} 条，每页 {page_size} 条，rec_id 乱序窗口 {shuffle_window} 条")
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            crawler = TDXAllNewsCrawler(base_url=base_url)
+            with redirect_stdout(io.StringIO()):
+                conn = crawler.create_database(os.path.join(tmp, 'incremental.db'))
+                crawler.save_all_data(conn, crawler.fetch_all_news(max_pages=200, page_size=page_size))
+            total = initial_rows
+            for burst in bursts:
+                total += burst
+                server.store = SyntheticNewsStore(total=total, days=1, end_date=end_date,
+                                                  shuffle_window=shuffle_window)
+                misses = crawler.cache_stats['misses']
+                start = time.perf_counter()
+                with redirect_stdout(io.StringIO()):
+                    new_data = crawler.fetch_incremental_news(crawler.get_watermark(conn), page_size=page_size)
+                    saved = crawler.save_all_data(conn, new_data) if new_data else 0
+                elapsed = time.perf_counter() - start
+                stored = conn.execute('SELECT COUNT(*) FROM all_stock_news').fetchone()[0]
+                pages = crawler.cache_stats['misses'] - misses
+
+                assert saved == burst and stored == total, (burst, saved, stored, total)
+                results.append((burst, pages, elapsed))
+                print(f"   新到达 {burst:>3} 条: 请求 {pages} 页，入库 {saved} 条，耗时 {elapsed * 1000:.1f}ms")
+            conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+def make_response_body(page_size):
+    """构造与真实接口同结构的响应字节串"""
+    content = []
+    for i in range(page_size):
+        title = f"测试股份(600{i % 1000:03d}):关于第{i}号临时公告的提示性公告"
+        content.append([
+            i + 1, 5549513 - i, title, "2025-09-24 17:57:00",
+            title + "。" + "公司董事会及全体董事保证本公告内容不存在任何虚假记载。" * 4,
+            "上交所", 20009684 - i, 0, 1
+        ])
+    response = {"HitCache": "L1:B1FB6080A43E", "ErrorCode": 0,
+                "ResultSets": [{"ColName": COL_NAMES, "Content": content}]}
+    return json.dumps(response, ensure_ascii=False).encode('utf-8')
+
+def iter_chunks(body, chunk_size=64 * 1024):
+    """按网络读取的块大小切分响应"""
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+def decode_full(body):
+    """原路径：完整解析JSON后逐行构造dict"""
+    data = json.loads(b''.join(iter_chunks(body)))
+    result_set = data['ResultSets'][0]
+    col_names = result_set['ColName']
+    rows = [dict(zip(col_names, row)) for row in result_set['Content']]
+    return len(rows)
+
+def decode_stream(body):
+    """流式路径：逐行产出元组，不保留整页"""
+    stream = ResultSetStream(iter_chunks(body))
+    stream.read_header()
+    count = 0
+    for row in stream:
+        count += 1
+    return count
+
+def measure_peak(func, *args):
+    """返回 (结果, 峰值内存字节, 耗时秒)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+def bench_decode(page_sizes=(50, 500, 5000)):
+    """比较完整JSON解析与流式解析的峰值内存"""
+    print("📊 响应解析内存基准（tracemalloc峰值，不含响应字节本身）")
+    results = []
+    for page_size in page_sizes:
+        body = make_response_body(page_size)
+        full_rows, full_peak, full_time = measure_peak(decode_full, body)
+        stream_rows, stream_peak, stream_time = measure_peak(decode_stream, body)
+        assert full_rows == stream_rows == page_size
+        results.append((page_size, full_peak, stream_peak))
+        print(f"   page_size {page_size:>5}: 响应 {len(body) / 1024:8.1f}KB | "
+              f"完整解析 {full_peak / 1024:8.1f}KB {full_time * 1000:6.1f}ms | "
+              f"流式解析 {stream_peak / 1024:8.1f}KB {stream_time * 1000:6.1f}ms")
+    return results
+
+def iter_synthetic_pages(total_rows, page_size=1000):
+    """按接口格式逐页生成合成数据（不一次性占用内存）"""
+    store = SyntheticNewsStore(total=total_rows, days=1)
+    day = store.end_date
+    for page in range(1, (total_rows + page_size - 1) // page_size + 1):
+        rows, _ = store.query(day, page, page_size)
+        yield {'ResultSets': [{'ColName': COL_NAMES, 'Content': rows}]}
+
+def bench_stream(max_pages=3, page_size=20_000, latency=0.0):
+    """流式入库的行/秒；响应体传输到70%时断开，应回滚该页、关闭响应并正常结束"""
+    store = SyntheticNewsStore(total=max_pages * page_size, days=1)
+
+    print(f"📊 流式入库基准: {max_pages}页 x {page_size:,}条")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, truncate_rate in (('完整响应', 0.0), ('中途断开', 1.0)):
+            server, base_url = start_simulator(latency, store=store, truncate_rate=truncate_rate)
+            crawler = TDXAllNewsCrawler(base_url=base_url)
+            responses = []
+            post = crawler.session.post
+
+            def tracked_post(*args, **kwargs):
+                response = post(*args, **kwargs)
+                responses.append(response)
+                return response
+
+            crawler.session.post = tracked_post
+            try:
+                start = time.perf_counter()
+                with redirect_stdout(io.StringIO()):
+                    conn = crawler.create_database(os.path.join(tmp, f'stream_{truncate_rate}.db'))
+                    inserted = crawler.stream_all_news(conn, max_pages, page_size)
+                    stored = conn.execute('SELECT COUNT(*) FROM all_stock_news').fetchone()[0]
+                    conn.close()
+                elapsed = time.perf_counter() - start
+            finally:
+                server.shutdown()
+                server.server_close()
+
+            expected = 0 if truncate_rate else max_pages * page_size
+            assert inserted == stored == expected, (label, inserted, stored)
+            assert responses and all(response.raw.closed for response in responses), label
+            results.append((label, inserted, elapsed))
+            print(f"   {label}: 新增 {inserted:,} 条，耗时 {elapsed:.2f}s，{len(responses)} 个响应均已关闭")
+    return results
+
+def legacy_save(crawler, conn, all_data):
+    """原入库方式：默认PRAGMA，逐行构造dict并逐行execute"""
+    cursor = conn.cursor()
+    total_inserted = 0
+    for page_data in all_data:
+        result_set = page_data['ResultSets'][0]
+        col_names = result_set['ColName']
+        for row in result_set['Content']:
+            data_dict = dict(zip(col_names, row))
+            title = data_dict.get('title', '')
+            stock_code, stock_name = crawler.extract_stock_info(title)
+            cursor.execute(crawler.INSERT_SQL, (
+                data_dict.get('pos', 0), data_dict.get('rec_id', 0), title,
+                data_dict.get('issue_date', ''), data_dict.get('summary', ''),
+                data_dict.get('src_info', ''), data_dict.get('relate_id', 0),
+                data_dict.get('Proc_Id', 0), data_dict.get('Mark_Id', 0),
+                stock_code, stock_name
+            ))
+            total_inserted += cursor.rowcount
+    conn.commit()
+    return total_inserted
+
+def bench_insert(row_counts=(10_000, 1_000_000)):
+    """比较逐行插入、executemany 批量插入及延后建立全文索引的批量插入的行/秒
+
+    全文索引触发器逐行分词是批量插入的主要开销之一，延后索引的计时包含导入后一次性建立索引的时间。
+    """
+    print("📊 入库基准（已扣除合成数据生成耗时）")
+    crawler = TDXAllNewsCrawler()
+    results = []
+    for total_rows in row_counts:
+        start = time.perf_counter()
+        for _ in iter_synthetic_pages(total_rows):
+            pass
+        generate_time = time.perf_counter() - start
+
+        timings = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            with redirect_stdout(io.StringIO()):
+                # 原方式：建表后恢复原有的重复索引及默认的 DELETE 日志和 FULL 同步
+                conn = crawler.create_database(os.path.join(tmp, 'legacy.db'))
+                conn.execute('CREATE INDEX idx_record_id ON all_stock_news(record_id)')
+                conn.execute('PRAGMA journal_mode=DELETE')
+                conn.execute('PRAGMA synchronous=FULL')
+                conn.execute('PRAGMA cache_size=-2000')
+                start = time.perf_counter()
+                legacy_count = legacy_save(crawler, conn, iter_synthetic_pages(total_rows))
+                timings['逐行插入'] = time.perf_counter() - start
+                conn.close()
+
+                conn = crawler.create_database(os.path.join(tmp, 'bulk.db'))
+                start = time.perf_counter()
+                bulk_count = crawler.save_all_data(conn, iter_synthetic_pages(total_rows))
+                timings['批量插入'] = time.perf_counter() - start
+                conn.close()
+
+                conn = crawler.create_database(os.path.join(tmp, 'deferred.db'))
+                start = time.perf_counter()
+                with crawler.deferred_search_index(conn):
+                    deferred_count = crawler.save_all_data(conn, iter_synthetic_pages(total_rows))
+                timings['批量插入+延后全文索引'] = time.perf_counter() - start
+                indexed = conn.execute("SELECT COUNT(*) FROM news_fts WHERE news_fts MATCH '\"股东大会\"'").fetchone()[0]
+                expected = conn.execute("SELECT COUNT(*) FROM all_stock_news WHERE title LIKE '%股东大会%' OR summary LIKE '%股东大会%'").fetchone()[0]
+                conn.close()
+
+        assert legacy_count == bulk_count == deferred_count == total_rows
+        assert indexed == expected
+        line = []
+        for name, elapsed in timings.items():
+            rows_per_sec = total_rows / max(elapsed - generate_time, 1e-9)
+            results.append((total_rows, name, rows_per_sec))
+            line.append(f"{name} {rows_per_sec:>10,.0f} 行/秒")
+        print(f"   {total_rows:>9,} 行: " + " | ".join(line))
+    return results
+
+def legacy_extract(titles):
+    """原提取方式：每条标题调用未编译的 re.search，只取第一只股票"""
+    results = []
+    for title in titles:
+        match = re.search(r'([^\(]+)\((\d{6})\)', title)
+        results.append((match.group(2), match.group(1).strip()) if match else (None, None))
+    return results
+
+def bench_extract(total_titles=1_000_000, batch_size=1000, multi_ratio=10):
+    """比较逐条 re.search 与批量提取的标题/秒（每 multi_ratio 条含一条多公司公告）"""
+    store = SyntheticNewsStore(total=total_titles, days=1)
+    rows, _ = store.query(store.end_date, 1, total_titles)
+    titles = [row[2] for row in rows]
+    for i in range(0, len(titles), multi_ratio):
+        titles[i] = f"{titles[i].split(':')[0]}、联合科技(000{i % 1000:03d})、新三板公司(832{i % 1000:03d}.NQ):关于共同投资的公告"
+    del rows
+
+    print(f"📊 股票实体提取基准: {len(titles):,} 条标题，每批 {batch_size} 条")
+    timings = {'逐条re.search': 0.0, '批量提取': 0.0}
+    links = 0
+    # 与入库路径一致按批处理、用完即弃，避免保留百万级结果带来的GC开销干扰计时
+    for i in range(0, len(titles), batch_size):
+        chunk = titles[i:i + batch_size]
+        start = time.perf_counter()
+        legacy = legacy_extract(chunk)
+        timings['逐条re.search'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = extract_stocks_batch(chunk)
+        timings['批量提取'] += time.perf_counter() - start
+
+        assert all(old[0] == (new[0][0] if new else None) for old, new in zip(legacy, found))
+        links += sum(len(stocks) for stocks in found)
+
+    for name, elapsed in timings.items():
+        print(f"   {name}: {len(titles) / elapsed:>12,.0f} 条/秒")
+    print(f"   批量提取识别出 {links:,} 个公告-股票关联（逐条方式只得到每条第一只）")
+    # 入库路径每条标题都要提取，多识别的关联不能以吞吐下降为代价
+    assert timings['批量提取'] <= timings['逐条re.search'], "批量提取慢于逐条 re.search"
+    return timings
+
+def bench_pipeline(workers_levels=(1, 4), max_pages=40, page_size=500, latency=0.08):
+    """比较先全部获取再入库与流水线（获取/解析/写入并行）的端到端耗时"""
+    store = SyntheticNewsStore(total=max_pages * page_size, days=1)
+    server, base_url = start_simulator(latency, store=store)
+
+    print(f"📊 端到端入库基准: {max_pages}页 x {page_size}条，模拟延迟 {latency * 1000:.0f}ms")
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for workers in workers_levels:
+                crawler = TDXAllNewsCrawler(base_url=base_url)
+                db_name = os.path.join(tmp, f'sequential_{workers}.db')
+                start = time.perf_counter()
+                with redirect_stdout(io.StringIO()):
+                    conn = crawler.create_database(db_name)
+                    all_data = crawler.fetch_all_news(max_pages=max_pages, page_size=page_size,
+                                                      concurrency=workers, host_rps=None)
+                    sequential_count = crawler.save_all_data(conn, all_data)
+                    conn.close()
+                sequential = time.perf_counter() - start
+
+                crawler = TDXAllNewsCrawler(base_url=base_url)
+                pipeline = IngestPipeline(crawler, os.path.join(tmp, f'pipeline_{workers}.db'),
+                                          fetch_workers=workers, host_rps=None)
+                start = time.perf_counter()
+                with redirect_stdout(io.StringIO()):
+                    pipeline_count = pipeline.run(max_pages=max_pages, page_size=page_size)
+                elapsed = time.perf_counter() - start
+
+                assert sequential_count == pipeline_count == max_pages * page_size
+                results.append((workers, sequential, elapsed))
+                queues = " | ".join(f"{stats['name']} 最大深度 {stats['max_depth']}/{stats['capacity']} "
+                                    f"上游阻塞 {stats['put_wait']:.2f}s" for stats in pipeline.metrics()['queues'])
+                print(f"   获取线程 {workers}: 先获取后入库 {sequential:.2f}s | 流水线 {elapsed:.2f}s "
+                      f"（提交 {pipeline.commits} 次）")
+                print(f"      {queues}")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def bench_api(configs=((0, 0), (8, 0), (8, 2)), total_rows=200_000, clients=8, requests_per_client=250):
+    """比较 (连接池大小, 热数据天数) 配置下的API延迟 p50/p99（关闭响应缓存）
+
+    连接池大小0为每次请求新建连接，热数据天数0为不启用内存热数据层。
+
+    分别测量进程内逐个处理请求的服务端耗时，以及多个客户端并发经HTTP请求的端到端耗时。
+    """
+    import random
+    import logging
+    import requests
+    from werkzeug.serving import make_server
+    from tdx_all_news_crawler import TDXNewsAPI
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    print(f"📊 API延迟基准: {total_rows:,} 条数据，{clients} 个并发客户端 x {requests_per_client} 次请求")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'api.db')
+        crawler = TDXAllNewsCrawler()
+        with redirect_stdout(io.StringIO()):
+            conn = crawler.create_database(db_name)
+            crawler.save_all_data(conn, iter_synthetic_pages(total_rows))
+            conn.close()
+
+        store = SyntheticNewsStore(total=total_rows, days=1)
+        codes = [code for _, code, _ in store.companies[:500]]
+        max_record = store.base_rec_id + total_rows
+
+        def make_paths(rng):
+            hour = rng.randint(7, 21)
+            return [
+                f"/api/news/{rng.randint(1, total_rows)}",
+                f"/api/news/since?rec_id={rng.randint(store.base_rec_id, max_record)}&limit=20",
+                f"/api/news/stocks?code={rng.choice(codes)}&cursor=&limit=20",
+                "/api/news?cursor=&limit=20",
+                f"/api/news?page={rng.randint(1, 50)}&limit=20",
+                f"/api/news?from={store.end_date} {hour:02d}:00:00&to={store.end_date} {hour:02d}:59:59&cursor=&limit=20",
+                "/api/news/sources",
+            ]
+
+        for pool_size, hot_days in configs:
+            api = TDXNewsAPI(db_name, cache_size=0, pool_size=pool_size, hot_days=hot_days)
+            label = f"连接池 {pool_size}" if pool_size else "每次新建连接"
+            if hot_days:
+                label += f" + 热数据 {hot_days} 天"
+
+            test_client = api.app.test_client()
+            rng = random.Random(0)
+            handled = []
+            for i in range(clients * requests_per_client):
+                paths = make_paths(rng)
+                path = paths[i % len(paths)]
+                start = time.perf_counter()
+                response = test_client.get(path)
+                handled.append(time.perf_counter() - start)
+                assert response.status_code == 200, path
+
+            server = make_server('127.0.0.1', 0, api.app, threaded=True)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            latencies = []
+            lock = threading.Lock()
+
+            def client(seed):
+                rng = random.Random(seed)
+                session = requests.Session()
+                local = []
+                for i in range(requests_per_client):
+                    paths = make_paths(rng)
+                    path = paths[i % len(paths)]
+                    start = time.perf_counter()
+                    response = session.get(base_url + path)
+                    local.append(time.perf_counter() - start)
+                    assert response.status_code == 200, path
+                with lock:
+                    latencies.extend(local)
+
+            try:
+                workers = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+                start = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - start
+            finally:
+                server.shutdown()
+                pool_stats = api.pool.stats()
+                api.pool.close()
+
+            results.append((pool_size, hot_days, percentile(handled, 0.50), percentile(handled, 0.99),
+                            percentile(latencies, 0.50), percentile(latencies, 0.99)))
+            print(f"   {label}: 服务端 p50 {percentile(handled, 0.50) * 1000:.2f}ms p99 {percentile(handled, 0.99) * 1000:.2f}ms | "
+                  f"HTTP并发 p50 {percentile(latencies, 0.50) * 1000:.2f}ms p99 {percentile(latencies, 0.99) * 1000:.2f}ms，"
+                  f"{len(latencies) / elapsed:.0f} 请求/秒 | 打开连接 {pool_stats['opened']}，等待 {pool_stats['waits']} 次")
+    return results
+
+def main():
+    benchmarks = {
+        'fetch': bench_fetch,
+        'incremental': bench_incremental,
+        'decode': bench_decode,
+        'stream': bench_stream,
+        'insert': bench_insert,
+        'extract': bench_extract,
+        'pipeline': bench_pipeline,
+        'api': bench_api,
+    }
+
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        if name not in benchmarks:
+            print("用法:")
+            print("  python tdx_benchmark.py [fetch|incremental|decode|stream|insert|extract|pipeline|api ...]")
+            return 1
+        benchmarks[name]()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+TQLEX流量录制与回放
+录制：把爬虫的每个请求/响应及耗时追加写入 gzip 压缩的 JSON Lines 抓包文件
+回放：用抓包文件代替网络驱动 TDXAllNewsCrawler，可按原速或加速重放
+"""
+
+import io
+import sys
+import gzip
+import json
+import time
+import base64
+import threading
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+def _body_text(body):
+    if body is None:
+        return ''
+    if isinstance(body, bytes):
+        return body.decode('utf-8', errors='replace')
+    return body
+
+def _strip_date(body):
+    """去掉TQLEX参数中的日期，用于跨日期回放时的近似匹配"""
+    try:
+        payload = json.loads(body)
+        params = payload.get('Params')
+        if isinstance(params, list) and params:
+            payload['Params'] = params[1:]
+        return json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    except (ValueError, AttributeError):
+        return body
+
+class CaptureRecorder:
+    """追加写入的压缩抓包文件
+
+    每条记录一行JSON，每次打开追加一个新的 gzip 成员，文件始终只追加不改写。
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = gzip.open(path, 'ab')
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.count = 0
+
+    def write(self, record):
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.count += 1
+
+    def record_response(self, response, *args, **kwargs):
+        """requests 响应钩子：记录请求与响应"""
+        request = response.request
+        content = response.content
+        try:
+            body = {'body': content.decode('utf-8')}
+        except UnicodeDecodeError:
+            body = {'body_b64': base64.b64encode(content).decode('ascii')}
+
+        self.write({
+            'ts': time.time(),
+            'offset': round(time.monotonic() - self.started, 6),
+            'elapsed': response.elapsed.total_seconds(),
+            'method': request.method,
+            'url': request.url,
+            'request_body': _body_text(request.body),
+            'status': response.status_code,
+            'content_type': response.headers.get('Content-Type', ''),
+            **body,
+        })
+        return response
+
+    def attach(self, session):
+        """挂载到 requests.Session，之后的所有请求都会被录制"""
+        session.hooks['response'].append(self.record_response)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+def read_capture(path):
+    """逐条读取抓包文件，容忍录制中断导致的文件尾不完整"""
+    with gzip.open(path, 'rb') as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, json.JSONDecodeError):
+            return
+
+class ReplayAdapter(BaseAdapter):
+    """从抓包文件返回响应的 requests 传输层
+
+    先按 (方法, URL, 请求体) 精确匹配，再忽略TQLEX日期参数匹配，最后按录制顺序返回。
+    speed 为回放倍速（1 为原速，0 表示不等待）。
+    """
+    def __init__(self, path, speed=1.0):
+        super().__init__()
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.records = list(read_capture(path))
+        self.used = [False] * len(self.records)
+        self.next_index = 0
+        self.exact = defaultdict(deque)
+        self.loose = defaultdict(deque)
+        for i, record in enumerate(self.records):
+            self.exact[(record['method'], record['url'], record['request_body'])].append(i)
+            self.loose[(record['method'], record['url'], _strip_date(record['request_body']))].append(i)
+        self.replayed = 0
+
+    def _take(self, queue):
+        while queue:
+            i = queue.popleft()
+            if not self.used[i]:
+                self.used[i] = True
+                return self.records[i]
+        return None
+
+    def _match(self, request):
+        body = _body_text(request.body)
+        with self.lock:
+            record = (self._take(self.exact[(request.method, request.url, body)])
+                      or self._take(self.loose[(request.method, request.url, _strip_date(body))]))
+            while record is None and self.next_index < len(self.records):
+                if not self.used[self.next_index]:
+                    self.used[self.next_index] = True
+                    record = self.records[self.next_index]
+                self.next_index += 1
+            if record is not None:
+                self.replayed += 1
+            return record
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        record = self._match(request)
+        if record is None:
+            raise ConnectionError(f"抓包文件中没有可回放的响应: {request.method} {request.url}")
+
+        if self.speed:
+            time.sleep(record['elapsed'] / self.speed)
+
+        if 'body_b64' in record:
+            content = base64.b64decode(record['body_b64'])
+        else:
+            content = record['body'].encode('utf-8')
+
+        response = Response()
+        response.status_code = record['status']
+        response.headers = CaseInsensitiveDict({
+            'Content-Type': record['content_type'],
+            'Content-Length': str(len(content)),
+        })
+        response._content = content
+        response._content_consumed = True
+        response.raw = io.BytesIO(content)
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=record['elapsed'])
+        return response
+
+    def close(self):
+        pass
+
+def attach_replay(crawler, path, speed=1.0):
+    """让爬虫从抓包文件获取数据，返回回放适配器"""
+    adapter = ReplayAdapter(path, speed)
+    # 以 base_url 为前缀挂载，优先于连接池的 http:// 适配器
+    crawler.session.mount(crawler.base_url, adapter)
+    return adapter
+
+def import_f12_capture(path, base_url="http://fast1.tdx.com.cn:7615"):
+    """把 process_real_f12_data.py 中的F12真实响应写入抓包文件"""
+    from process_real_f12_data import RealDataProcessor
+    from tdx_all_news_crawler import TDXAllNewsCrawler
+
+    crawler = TDXAllNewsCrawler(base_url=base_url)
+    payload = crawler.build_payload(1, 50)
+    payload['Params'][0] = "2025-09-24 00:00:00"
+    response = RealDataProcessor().load_real_data()
+
+    recorder = CaptureRecorder(path)
+    recorder.write({
+        'ts': time.time(),
+        'offset': 0.0,
+        'elapsed': 0.08,
+        'method': 'POST',
+        'url': f"{base_url}/TQLEX?Entry=CWServ.tdxzb_zxts_ywbb",
+        'request_body': json.dumps(payload, ensure_ascii=False),
+        'status': 200,
+        'content_type': 'application/json; charset=utf-8',
+        'body': json.dumps(response, ensure_ascii=False),
+    })
+    recorder.close()
+    print(f"✅ 已导入F12响应到抓包文件: {path}")
+
+def replay_crawl(path, speed=1.0, db_name='tdx_replay.db', max_pages=10, page_size=50):
+    """用抓包文件驱动一次完整爬取，用于离线测试解析与入库"""
+    from tdx_all_news_crawler import TDXAllNewsCrawler
+
+    records = list(read_capture(path))
+    if not records:
+        print("❌ 抓包文件为空")
+        return 0
+
+    base_url = records[0]['url'].split('/TQLEX')[0].split('/site/')[0]
+    crawler = TDXAllNewsCrawler(base_url=base_url)
+    adapter = attach_replay(crawler, path, speed)
+
+    conn = crawler.create_database(db_name)
+    start = time.perf_counter()
+    all_data = crawler.fetch_all_news(max_pages=max_pages, page_size=page_size, host_rps=None)
+    saved_count = crawler.save_all_data(conn, all_data) if all_data else 0
+    elapsed = time.perf_counter() - start
+    conn.close()
+
+    pace = f"{speed}倍速" if speed else "不等待"
+    print(f"🎬 回放完成: {adapter.replayed}/{len(records)} 个响应，新增 {saved_count} 条，耗时 {elapsed:.2f}s（{pace}）")
+    return saved_count
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == 'import-f12':
+        import_f12_capture(sys.argv[2])
+    elif len(sys.argv) > 2 and sys.argv[1] == 'replay':
+        speed = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+        replay_crawl(sys.argv[2], speed)
+    elif len(sys.argv) > 2 and sys.argv[1] == 'show':
+        for record in read_capture(sys.argv[2]):
+            print(f"{record['offset']:>10.3f}s {record['method']} {record['url']} -> {record['status']} "
+                  f"({record['elapsed'] * 1000:.0f}ms)")
+    else:
+        print("用法:")
+        print("  python tdx_capture.py import-f12 <抓包文件>   - 导入F12真实响应")
+        print("  python tdx_capture.py replay <抓包文件> [倍速] - 回放抓包驱动爬虫（0为不等待）")
+        print("  python tdx_capture.py show <抓包文件>         - 查看抓包内容")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
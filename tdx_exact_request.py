@@ -1,8 +1,8 @@
 import requests
 import json
 import sqlite3
-import re
 from datetime import datetime
+from tdx_stocks import extract_stock_info
 
 class TDXExactRequest:
     def __init__(self):
@@ -176,13 +176,7 @@ class TDXExactRequest:
     
     def extract_stock_info(self, title):
         """从标题中提取股票代码和名称"""
-        pattern = r'([^\(]+)\((\d{6})\)'
-        match = re.search(pattern, title)
-        if match:
-            stock_name = match.group(1).strip()
-            stock_code = match.group(2)
-            return stock_code, stock_name
-        return None, None
+        return extract_stock_info(title)
     
     def save_data(self, conn, data):
         """保存数据到数据库"""
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+流式数据导出
+按块迭代数据库游标，直接写出 CSV / NDJSON（文件名以 .gz 结尾时gzip压缩），内存占用与表大小无关；
+支持日期、股票过滤，以及只追加上次导出之后新入库记录的增量导出。
+另可按发布日期导出分区 Parquet 供分析使用（需安装 pyarrow）
+"""
+
+import os
+import sys
+import csv
+import gzip
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+
+from tdx_issue_time import issue_day_sql, to_issue_ts
+
+# Parquet导出为可选功能
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 公告表导出的列及CSV表头
+NEWS_COLUMNS = (
+    ('position', '序号'),
+    ('record_id', '记录ID'),
+    ('title', '标题'),
+    ('issue_date', '发布时间'),
+    ('summary', '摘要'),
+    ('source', '来源'),
+    ('stock_code', '股票代码'),
+    ('stock_name', '股票名称'),
+    ('relate_id', '关联ID'),
+    ('proc_id', '处理ID'),
+    ('mark_id', '标记ID'),
+)
+
+CHUNK_SIZE = 5000
+
+def iter_cursor(cursor, chunk_size=CHUNK_SIZE):
+    """按块读取已执行查询的结果，不一次性 fetchall"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+def detect_format(path):
+    """根据扩展名判断导出格式：.csv 或 .ndjson/.jsonl，可带 .gz 后缀"""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+def open_output(path, append=False):
+    """打开文本输出，.gz 结尾时写gzip（追加时新增一个gzip成员）"""
+    mode = 'at' if append else 'wt'
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8', newline='')
+    return open(path, mode[0], encoding='utf-8', newline='')
+
+def write_rows(rows, path, columns, headers=None, fmt=None, append=False):
+    """把行迭代器写入文件，返回写出的行数
+
+    CSV 新建文件时写 BOM（兼容Excel）和表头，追加时只写数据行；NDJSON 每行一个JSON对象。
+    """
+    fmt = fmt or detect_format(path)
+    count = 0
+    with open_output(path, append) as f:
+        if fmt == 'ndjson':
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                f.write('\n')
+                count += 1
+        else:
+            writer = csv.writer(f)
+            if not append:
+                f.write('\ufeff')
+                writer.writerow(headers or columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    return count
+
+def export_query(conn, sql, path, params=(), fmt=None, chunk_size=CHUNK_SIZE):
+    """导出任意查询结果（列名取自查询本身），返回行数"""
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+    return write_rows(iter_cursor(cursor, chunk_size), path, columns, fmt=fmt)
+
+def news_filters(start_date=None, end_date=None, stock_code=None, id_range=None):
+    """构造公告表的过滤条件，返回 (条件列表, 参数列表)；end_date 包含当天"""
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append('issue_ts >= ?')
+        params.append(to_issue_ts(start_date))
+    if end_date:
+        conditions.append('issue_ts < ?')
+        params.append(to_issue_ts(end_date, end=True))
+    if stock_code:
+        conditions.append('stock_code = ?')
+        params.append(stock_code)
+    if id_range:
+        conditions.append('id > ? AND id <= ?')
+        params.extend(id_range)
+    return conditions, params
+
+def state_path_for(path):
+    return path + '.state'
+
+def load_export_state(path):
+    """读取增量导出状态（已导出的最大行id及累计行数）"""
+    state_path = state_path_for(path)
+    if not (os.path.exists(path) and os.path.exists(state_path)):
+        return None
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def export_news(conn, path, start_date=None, end_date=None, stock_code=None,
+                since_last=False, fmt=None, chunk_size=CHUNK_SIZE, headers=None):
+    """流式导出 all_stock_news，返回本次写出的行数
+
+    普通导出按发布时间倒序重写整个文件；since_last=True 时按入库顺序（id）只追加上次导出之后
+    新入库的记录，状态保存在 <文件名>.state 中，首次运行时为全量导出。增量导出的过滤条件
+    一并记入状态，与上次不一致时抛出 ValueError，避免同一文件混入不同条件的数据。
+    headers 为CSV表头，默认使用 NEWS_COLUMNS 中的中文表头。
+    """
+    cursor = conn.cursor()
+    state = None
+    id_range = None
+    filters = {name: value for name, value in
+               (('start_date', start_date), ('end_date', end_date), ('stock_code', stock_code)) if value}
+    if since_last:
+        state = load_export_state(path)
+        # 旧版状态文件没有记录过滤条件，视为未过滤
+        if state and state.get('filters', {}) != filters:
+            raise ValueError(f"{path} 上次增量导出的过滤条件为 {state.get('filters', {})}，"
+                             f"与本次不一致，请使用新的输出文件或删除 {state_path_for(path)} 后重新全量导出")
+        # 以导出开始时的最大id为上限，导出过程中新入库的记录留给下一次
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM all_stock_news')
+        max_id = cursor.fetchone()[0]
+        id_range = (state['max_id'] if state else 0, max_id)
+
+    conditions, params = news_filters(start_date, end_date, stock_code, id_range)
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    order_sql = 'id' if since_last else 'issue_ts DESC, record_id DESC'
+    columns = [column for column, _ in NEWS_COLUMNS]
+    headers = headers or [header for _, header in NEWS_COLUMNS]
+
+    cursor.execute(f"SELECT {', '.join(columns)} FROM all_stock_news {where_sql} ORDER BY {order_sql}", params)
+    count = write_rows(iter_cursor(cursor, chunk_size), path, columns, headers, fmt, append=state is not None)
+
+    if since_last:
+        total = (state['rows'] if state else 0) + count
+        with open(state_path_for(path), 'w', encoding='utf-8') as f:
+            json.dump({'max_id': max_id, 'rows': total,
+                       'filters': filters,
+                       'exported_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, f, ensure_ascii=False)
+    return count
+
+PARQUET_STATE_FILE = '_export_state.json'
+
+def parquet_schema():
+    """Parquet列类型：整数、时间戳，来源和股票名称字典编码"""
+    return pa.schema([
+        ('id', pa.int64()),
+        ('position', pa.int32()),
+        ('record_id', pa.int64()),
+        ('title', pa.string()),
+        ('issue_time', pa.timestamp('s')),
+        ('summary', pa.string()),
+        ('source', pa.dictionary(pa.int32(), pa.string())),
+        ('stock_code', pa.string()),
+        ('stock_name', pa.dictionary(pa.int32(), pa.string())),
+        ('relate_id', pa.int64()),
+        ('proc_id', pa.int32()),
+        ('mark_id', pa.int32()),
+        ('crawl_time', pa.timestamp('s')),
+    ])
+
+PARQUET_SQL = '''
+SELECT id, position, record_id, title, issue_date, summary, source,
+       stock_code, stock_name, relate_id, proc_id, mark_id, crawl_time
+FROM all_stock_news
+WHERE issue_ts >= ? AND issue_ts < ?
+ORDER BY issue_ts, record_id
+'''
+
+def _parquet_batch(rows, schema):
+    """把一块查询结果转换为带类型的 RecordBatch"""
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_timestamp(field.type):
+            # 文本时间由Arrow批量解析，无法解析的值为空
+            text = pa.array(values, pa.string())
+            arrays.append(pc.strptime(text, format='%Y-%m-%d %H:%M:%S', unit='s', error_is_null=True))
+        elif pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def write_parquet_partition(conn, out_dir, day, chunk_size=CHUNK_SIZE):
+    """导出一天的数据到 issue_day=<日期>/part-0.parquet，按块写入行组，返回行数"""
+    schema = parquet_schema()
+    partition_dir = os.path.join(out_dir, f'issue_day={day}')
+    os.makedirs(partition_dir, exist_ok=True)
+    path = os.path.join(partition_dir, 'part-0.parquet')
+    tmp_path = path + '.tmp'
+
+    cursor = conn.cursor()
+    cursor.execute(PARQUET_SQL, (to_issue_ts(day), to_issue_ts(day, end=True)))
+    count = 0
+    with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.write_batch(_parquet_batch(rows, schema))
+            count += len(rows)
+    # 写完再替换，读取方不会看到写了一半的分区
+    os.replace(tmp_path, path)
+    return count
+
+def export_parquet(conn, out_dir='tdx_news_parquet', full=False, chunk_size=CHUNK_SIZE):
+    """按发布日期导出分区Parquet数据集，返回 (更新的分区数, 写出的行数)
+
+    只重写上次导出之后有新入库记录的日期分区（通常只有当天），其余分区保持不动；
+    状态（已导出的最大行id）保存在数据集目录的 _export_state.json 中，full=True 时全量重建。
+    """
+    if pa is None:
+        raise RuntimeError("Parquet导出需要 pyarrow: pip install pyarrow")
+
+    os.makedirs(out_dir, exist_ok=True)
+    state_path = os.path.join(out_dir, PARQUET_STATE_FILE)
+    state = {'max_id': 0, 'partitions': {}}
+    if not full and os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+    cursor = conn.cursor()
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM all_stock_news')
+    max_id = cursor.fetchone()[0]
+    # 新入库记录涉及的日期由 issue_ts 换算，与分区的时间范围一致；无法解析的时间为0，跳过
+    cursor.execute(f'''
+    SELECT DISTINCT {issue_day_sql('issue_ts')}
+    FROM all_stock_news
+    WHERE id > ? AND id <= ? AND issue_ts > 0
+    ''', (state['max_id'], max_id))
+    days = sorted(row[0] for row in cursor.fetchall())
+
+    total = 0
+    for day in days:
+        try:
+            count = write_parquet_partition(conn, out_dir, day, chunk_size)
+        except ValueError:
+            print(f"⚠️ 跳过无法识别的日期: {day}")
+            continue
+        state['partitions'][day] = count
+        total += count
+
+    state['max_id'] = max_id
+    state['exported_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    return len(days), total
+
+def main():
+    parser = argparse.ArgumentParser(description='流式导出公告数据（CSV / NDJSON，.gz 结尾自动压缩；目录为分区Parquet）')
+    parser.add_argument('output', help='输出文件，如 news.csv、news.ndjson.gz；--parquet 时为数据集目录')
+    parser.add_argument('--db', default='tdx_all_news.db', help='数据库文件')
+    parser.add_argument('--from', dest='start_date', help='开始日期 YYYY-MM-DD')
+    parser.add_argument('--to', dest='end_date', help='结束日期 YYYY-MM-DD（含当天）')
+    parser.add_argument('--stock', dest='stock_code', help='股票代码')
+    parser.add_argument('--since-last', action='store_true', help='只追加上次导出之后新入库的记录')
+    parser.add_argument('--parquet', action='store_true', help='按发布日期导出分区Parquet（增量更新有新数据的分区）')
+    parser.add_argument('--full', action='store_true', help='Parquet全量重建')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.parquet:
+            partitions, count = export_parquet(conn, args.output, full=args.full)
+            print(f"📦 Parquet导出完成: 更新 {partitions} 个日期分区，共 {count} 条记录 -> {args.output}")
+        else:
+            count = export_news(conn, args.output, args.start_date, args.end_date, args.stock_code, args.since_last)
+            print(f"📄 已导出 {count} 条记录到: {args.output}")
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+最近N天公告的内存热数据层
+API进程内保存发布时间在最近 days 天内的公告，按 (issue_ts, record_id) 有序存放，并按股票代码
+（含同一公告涉及的多家公司）和来源建立二级索引。爬虫提交新数据使版本号变化时，按自增id增量加载
+新入库的行；窗口内的分页请求直接由内存返回，窗口之外或无法确定结果完整的请求仍交给SQLite。
+"""
+
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+from tdx_issue_time import ISSUE_TZ, to_issue_ts
+
+# all_stock_news 的列，顺序与建表语句一致
+NEWS_COLUMNS = ('id', 'position', 'record_id', 'title', 'issue_date', 'summary', 'source',
+                'relate_id', 'proc_id', 'mark_id', 'stock_code', 'stock_name', 'crawl_time', 'issue_ts')
+
+# 增量加载按主键范围查找新行；全量加载沿 (issue_ts, record_id) 索引读取窗口，无需排序
+LOAD_SQL = f'''
+SELECT {', '.join(NEWS_COLUMNS)} FROM all_stock_news
+WHERE id > ? AND id <= ? AND issue_ts >= ?
+ORDER BY issue_ts, record_id
+'''
+
+FULL_LOAD_SQL = f'''
+SELECT {', '.join(NEWS_COLUMNS)} FROM all_stock_news
+WHERE +id > ? AND +id <= ? AND issue_ts >= ?
+ORDER BY issue_ts, record_id
+'''
+
+LOAD_LINKS_SQL = '''
+SELECT s.record_id, s.stock_code FROM news_stocks s
+JOIN all_stock_news a ON a.record_id = s.record_id
+WHERE a.id > ? AND a.id <= ? AND a.issue_ts >= ?
+'''
+
+# 窗口内的公告数及其股票关联数，与内存中的数量不一致时全量重新加载
+WINDOW_COUNT_SQL = 'SELECT COUNT(*) FROM all_stock_news WHERE issue_ts >= ? AND id <= ?'
+WINDOW_LINKS_SQL = '''
+SELECT COUNT(*) FROM all_stock_news a
+JOIN news_stocks s ON s.record_id = a.record_id
+WHERE a.issue_ts >= ? AND a.id <= ?
+'''
+
+class NewsRow:
+    """一条公告（__slots__ 存储，比 sqlite3.Row 转 dict 更省内存）"""
+    __slots__ = NEWS_COLUMNS + ('key', 'stocks')
+
+    def __init__(self, values, stocks=()):
+        (self.id, self.position, self.record_id, self.title, self.issue_date, self.summary, self.source,
+         self.relate_id, self.proc_id, self.mark_id, self.stock_code, self.stock_name, self.crawl_time,
+         self.issue_ts) = values
+        self.key = (self.issue_ts, self.record_id)
+        self.stocks = stocks
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in NEWS_COLUMNS}
+
+class SortedRows:
+    """按 (issue_ts, record_id) 升序排列的行，新公告通常追加在末尾"""
+    __slots__ = ('keys', 'rows')
+
+    def __init__(self):
+        self.keys = []
+        self.rows = []
+
+    def add(self, row):
+        if not self.keys or row.key > self.keys[-1]:
+            self.keys.append(row.key)
+            self.rows.append(row)
+            return True
+        i = bisect.bisect_left(self.keys, row.key)
+        if i < len(self.keys) and self.keys[i] == row.key:
+            return False
+        self.keys.insert(i, row.key)
+        self.rows.insert(i, row)
+        return True
+
+    def evict_before(self, issue_ts):
+        """淘汰发布时间早于 issue_ts 的行"""
+        i = bisect.bisect_left(self.keys, (issue_ts,))
+        del self.keys[:i]
+        del self.rows[:i]
+
+    def newest(self, limit, before=None, offset=0):
+        """按倒序返回 key 小于 before 的行，跳过前 offset 行"""
+        end = bisect.bisect_left(self.keys, before) if before is not None else len(self.keys)
+        end -= offset
+        if end <= 0:
+            return []
+        return self.rows[max(0, end - limit):end][::-1]
+
+class HotNewsTier:
+    """最近 days 天公告的内存副本及按股票、来源的二级索引"""
+    def __init__(self, days=2):
+        self.days = days
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+        self.reset()
+
+    def reset(self):
+        self.all = SortedRows()
+        self.by_stock = {}
+        self.by_source = {}
+        self.links = 0
+        self.max_id = 0
+        self.cutoff = None
+        self.cutoff_ts = None
+        # 数据库中所有公告都在窗口内时，窗口内查不满也说明没有更多数据
+        self.complete = False
+
+    def window_start(self):
+        """窗口起始日期（含，按北京时间），如 days=2 时为昨天"""
+        return (datetime.now(ISSUE_TZ).date() - timedelta(days=self.days - 1)).strftime('%Y-%m-%d')
+
+    def stale(self):
+        """跨天后需要淘汰过期的行"""
+        return self.cutoff != self.window_start()
+
+    def add(self, row):
+        if not self.all.add(row):
+            return
+        self.links += len(row.stocks)
+        for code in row.stocks:
+            self.by_stock.setdefault(code, SortedRows()).add(row)
+        self.by_source.setdefault(row.source, SortedRows()).add(row)
+
+    def evict(self, cutoff_ts):
+        self.all.evict_before(cutoff_ts)
+        self.links = sum(len(row.stocks) for row in self.all.rows)
+        for index in (self.by_stock, self.by_source):
+            for name in list(index):
+                index[name].evict_before(cutoff_ts)
+                if not index[name].rows:
+                    del index[name]
+
+    def load(self, conn, after_id, max_id, cutoff_ts):
+        stocks = {}
+        for record_id, code in conn.execute(LOAD_LINKS_SQL, (after_id, max_id, cutoff_ts)):
+            stocks.setdefault(record_id, []).append(code)
+        count = 0
+        sql = LOAD_SQL if after_id else FULL_LOAD_SQL
+        for values in conn.execute(sql, (after_id, max_id, cutoff_ts)):
+            self.add(NewsRow(tuple(values), tuple(stocks.get(values[2], ()))))
+            count += 1
+        return count
+
+    def refresh(self, conn):
+        """加载上次之后新入库的行并淘汰窗口外的行，返回新加载的行数
+
+        按自增id增量加载。以下情况全量重新加载：窗口内公告数或股票关联数与数据库不一致（如有删除、
+        数据库被替换、关联表被清空），或刷新时没有新行（版本号因 rebuild-stocks 等维护操作变化，
+        可能重写了已加载行的关联；跨天刷新时同样全量加载）。
+        """
+        cutoff = self.window_start()
+        cutoff_ts = to_issue_ts(cutoff)
+        with self.lock:
+            max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM all_stock_news').fetchone()[0]
+            if max_id <= self.max_id:
+                self.reset()
+            if cutoff != self.cutoff:
+                self.evict(cutoff_ts)
+                self.cutoff, self.cutoff_ts = cutoff, cutoff_ts
+
+            loaded = self.load(conn, self.max_id, max_id, cutoff_ts)
+            self.max_id = max_id
+
+            count = conn.execute(WINDOW_COUNT_SQL, (cutoff_ts, max_id)).fetchone()[0]
+            links = conn.execute(WINDOW_LINKS_SQL, (cutoff_ts, max_id)).fetchone()[0]
+            if count != len(self.all.rows) or links != self.links:
+                self.reset()
+                self.cutoff, self.cutoff_ts = cutoff, cutoff_ts
+                loaded = self.load(conn, 0, max_id, cutoff_ts)
+                self.max_id = max_id
+
+            total = conn.execute('SELECT total_count FROM news_summary WHERE id = 1').fetchone()
+            self.complete = total is not None and total[0] == len(self.all.rows)
+            self.loads += 1
+            return loaded
+
+    def query(self, limit, before=None, offset=0, stock_code=None, source=None):
+        """按 (issue_ts, record_id) 倒序返回最多 limit 行
+
+        before 为游标位置 (issue_ts, record_id)；位置在窗口之外，或窗口内不足 limit 行而窗口外
+        可能还有数据时返回 None，由调用方改查数据库。
+        """
+        with self.lock:
+            if self.cutoff is None or (before is not None and before < (self.cutoff_ts,)):
+                self.misses += 1
+                return None
+
+            if stock_code is not None:
+                rows = self.by_stock.get(stock_code)
+            elif source is not None:
+                rows = self.by_source.get(source)
+            else:
+                rows = self.all
+            result = rows.newest(limit, before, offset) if rows else []
+
+            if len(result) < limit and not self.complete:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def stats(self):
+        return {
+            'days': self.days,
+            'window_start': self.cutoff,
+            'rows': len(self.all.rows),
+            'stocks': len(self.by_stock),
+            'sources': len(self.by_source),
+            'complete': self.complete,
+            'loads': self.loads,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
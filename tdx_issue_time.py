@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+公告发布时间换算
+接口返回的 issue_date 是北京时间文本（如 2025-09-24 17:57:00），入库时另存为整数时间戳 issue_ts
+（Unix秒），排序、游标分页和时间范围过滤都走 issue_ts 上的索引，前端也无需再逐条解析文本。
+北京时间没有夏令时，固定为 UTC+8。
+"""
+
+from datetime import datetime, timedelta, timezone
+
+ISSUE_TZ_OFFSET = 8 * 3600
+ISSUE_TZ = timezone(timedelta(seconds=ISSUE_TZ_OFFSET))
+
+# 接受的时间文本格式；只有日期时表示当天 00:00:00
+TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+def issue_ts_sql(expression):
+    """SQLite中由 issue_date 文本计算 issue_ts 的表达式；无法解析的时间记为0，与空日期一样排在最早"""
+    return f"COALESCE(CAST(strftime('%s', {expression}) AS INTEGER) - {ISSUE_TZ_OFFSET}, 0)"
+
+def to_issue_ts(value, end=False):
+    """把北京时间文本或整数时间戳转换为 issue_ts，格式错误时抛出 ValueError
+
+    end=True 时返回包含该时间的区间上界（不含）：只有日期时为次日零点，否则为下一秒。
+    """
+    text = str(value).strip()
+    if text.isdigit():
+        return int(text) + (1 if end else 0)
+
+    for fmt in TIME_FORMATS:
+        try:
+            moment = datetime.strptime(text, fmt).replace(tzinfo=ISSUE_TZ)
+        except ValueError:
+            continue
+        if end:
+            moment += timedelta(days=1) if fmt == '%Y-%m-%d' else timedelta(seconds=1)
+        return int(moment.timestamp())
+    raise ValueError(f'无法识别的时间: {value}')
+
+def issue_day_sql(expression):
+    """SQLite中由 issue_ts 计算北京时间日期（YYYY-MM-DD）的表达式"""
+    return f"date({expression} + {ISSUE_TZ_OFFSET}, 'unixepoch')"
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+分阶段入库流水线
+获取 -> 解析 -> 写入 三个阶段各自在独立线程中运行，由有界队列连接：
+多个获取线程并发请求分页，解析线程按页码顺序转换行数据并判断何时停止，唯一的写入线程持有
+SQLite连接，按行数或时间分批提交。队列满时上游阻塞（背压），每个队列记录深度和阻塞时间。
+"""
+
+import sys
+import time
+import queue
+import threading
+from urllib.parse import urlparse
+
+from tdx_all_news_crawler import TDXAllNewsCrawler, HostThrottle, snapshot_path_for
+
+# 上游阶段结束标记
+DONE = object()
+
+class MeteredQueue(queue.Queue):
+    """记录深度及双方等待时间的有界队列"""
+    def __init__(self, name, maxsize):
+        super().__init__(maxsize)
+        self.name = name
+        self.puts = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.put_wait = 0.0     # 上游因队列已满而阻塞的时间（背压）
+        self.get_wait = 0.0     # 下游等待数据的时间
+
+    def _put(self, item):
+        # 在队列锁内调用，可直接更新深度统计
+        super()._put(item)
+        depth = self._qsize()
+        self.puts += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+
+    def put(self, item, block=True, timeout=None):
+        start = time.perf_counter()
+        super().put(item, block, timeout)
+        with self.mutex:
+            self.put_wait += time.perf_counter() - start
+
+    def get(self, block=True, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            with self.mutex:
+                self.get_wait += time.perf_counter() - start
+
+    def stats(self):
+        with self.mutex:
+            return {
+                'name': self.name,
+                'capacity': self.maxsize,
+                'depth': self._qsize(),
+                'max_depth': self.max_depth,
+                'avg_depth': self.depth_total / self.puts if self.puts else 0.0,
+                'puts': self.puts,
+                'put_wait': self.put_wait,
+                'get_wait': self.get_wait,
+            }
+
+class IngestPipeline:
+    """获取、解析、写入并行的入库流水线
+
+    fetch_workers 为并发获取线程数，queue_size 为各阶段间队列容量；写入线程在未提交行数
+    达到 batch_rows 或距本批第一次写入超过 batch_seconds 时提交。获取线程最多领先解析线程
+    fetch_workers + queue_size 页，某一页迟迟未返回时也不会无限缓存后续页面。
+    host_rps 为每个主机每秒最多请求数，默认不限速（在途请求数由 fetch_workers 限制）。
+    """
+    def __init__(self, crawler, db_name='tdx_all_news.db', fetch_workers=2, queue_size=8,
+                 batch_rows=2000, batch_seconds=1.0, host_rps=None):
+        self.crawler = crawler
+        self.db_name = db_name
+        self.fetch_workers = max(1, fetch_workers)
+        self.queue_size = queue_size
+        self.batch_rows = batch_rows
+        self.batch_seconds = batch_seconds
+        self.host_rps = host_rps
+
+    def reset(self):
+        self.raw_pages = MeteredQueue('raw_pages', self.queue_size)
+        self.parsed_pages = MeteredQueue('parsed_pages', self.queue_size)
+        self.window = threading.Semaphore(self.fetch_workers + self.queue_size)
+        self.stop = threading.Event()
+        self.page_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.next_page = 1
+        self.stage_stats = {stage: {'items': 0, 'busy': 0.0} for stage in ('fetch', 'parse', 'write')}
+        self.total_records = 0
+        self.pages_parsed = 0
+        self.total_inserted = 0
+        self.commits = 0
+        self.write_failed = False
+        # 已交给写入阶段的页面的HitCache，以及是否无缺口地获取到数据末尾
+        self.cache_tokens = []
+        self.walk_complete = False
+        self.elapsed = 0.0
+
+    def record(self, stage, busy, items=1):
+        with self.stats_lock:
+            self.stage_stats[stage]['items'] += items
+            self.stage_stats[stage]['busy'] += busy
+
+    def fetch_worker(self, max_pages, page_size, throttle, host):
+        """获取阶段：领取下一个页码并请求，原始响应放入 raw_pages"""
+        try:
+            while not self.stop.is_set():
+                # 限制领先解析阶段的页数，停止时不再等待
+                if not self.window.acquire(timeout=0.1):
+                    continue
+                with self.page_lock:
+                    page = self.next_page
+                    self.next_page += 1
+                if page > max_pages or self.stop.is_set():
+                    break
+
+                throttle.wait(host)
+                start = time.perf_counter()
+                page_data = self.crawler.fetch_page_data(page, page_size)
+                self.record('fetch', time.perf_counter() - start)
+                self.raw_pages.put((page, page_data))
+        finally:
+            self.raw_pages.put(DONE)
+
+    def parse_worker(self, page_size):
+        """解析阶段：按页码顺序转换为入库参数，遇到与 fetch_all_news 相同的停止条件时通知获取阶段"""
+        pending = {}
+        expected = 1
+        finished = 0
+        try:
+            while finished < self.fetch_workers:
+                item = self.raw_pages.get()
+                if item is DONE:
+                    finished += 1
+                    continue
+                if self.stop.is_set():
+                    # 停止点之后的在途页面直接丢弃
+                    continue
+
+                page, page_data = item
+                pending[page] = page_data
+                while expected in pending and not self.stop.is_set():
+                    self.window.release()
+                    self.parse_page(expected, pending.pop(expected), page_size)
+                    expected += 1
+        except Exception as e:
+            print(f"❌ 解析阶段异常: {e}")
+            self.walk_complete = False
+            self.stop.set()
+            while finished < self.fetch_workers:
+                if self.raw_pages.get() is DONE:
+                    finished += 1
+        finally:
+            self.parsed_pages.put(DONE)
+
+    def parse_page(self, page, page_data, page_size):
+        if page_data is None:
+            print("❌ 获取数据失败，停止获取")
+            self.stop.set()
+            return
+        if page_data.get('CacheHit'):
+            # 数据按新到旧排列，本页未变化则之后的页面也未变化
+            print("📄 页面未变化，停止获取")
+            self.walk_complete = True
+            self.stop.set()
+            return
+
+        result_sets = page_data.get('ResultSets', [])
+        if not result_sets:
+            print("📄 无结果集，停止获取")
+            self.walk_complete = True
+            self.stop.set()
+            return
+        content = result_sets[0].get('Content', [])
+        if not content:
+            print("📄 无更多数据，停止获取")
+            self.walk_complete = True
+            self.stop.set()
+            return
+
+        start = time.perf_counter()
+        links = []
+        rows = list(self.crawler.prepare_rows(result_sets[0]['ColName'], content, links))
+        self.record('parse', time.perf_counter() - start)
+        self.parsed_pages.put((page, rows, links))
+        self.cache_tokens.append(page_data.get('CacheToken'))
+
+        self.pages_parsed += 1
+        self.total_records += len(content)
+        print(f"📊 累计获取: {self.total_records} 条记录")
+
+        # 如果当前页数据不足一页，说明没有更多数据了
+        if len(content) < page_size:
+            print("📄 已获取所有可用数据")
+            self.walk_complete = True
+            self.stop.set()
+
+    def write_worker(self):
+        """写入阶段：唯一持有SQLite连接的线程，按行数或时间分批提交"""
+        conn = None
+        try:
+            conn = self.crawler.create_database(self.db_name)
+            cursor = conn.cursor()
+            batch_records = 0
+            batch_inserted = 0
+            deadline = None
+
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.parsed_pages.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is DONE:
+                    break
+
+                if item is not None:
+                    page, rows, links = item
+                    start = time.perf_counter()
+                    inserted = self.crawler.insert_rows(cursor, rows, links)
+                    self.record('write', time.perf_counter() - start)
+                    batch_records += len(rows)
+                    batch_inserted += inserted
+                    print(f"💾 第{page}页写入: {inserted} 条记录")
+                    if deadline is None:
+                        deadline = time.monotonic() + self.batch_seconds
+
+                if batch_records and (batch_records >= self.batch_rows or time.monotonic() >= deadline):
+                    self.commit(conn, batch_inserted)
+                    batch_records = batch_inserted = 0
+                    deadline = None
+
+            if batch_records:
+                self.commit(conn, batch_inserted)
+        except Exception as e:
+            print(f"❌ 写入阶段异常: {e}")
+            self.write_failed = True
+            # 丢弃未提交的批次，已提交的批次不受影响
+            if conn is not None:
+                conn.rollback()
+            self.stop.set()
+            # 继续取走解析结果，避免上游阻塞在已满的队列上
+            while self.parsed_pages.get() is not DONE:
+                pass
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def commit(self, conn, inserted):
+        start = time.perf_counter()
+        self.crawler.commit_batch(conn, inserted)
+        self.record('write', time.perf_counter() - start, items=0)
+        self.commits += 1
+        self.total_inserted += inserted
+
+    def run(self, max_pages=10, page_size=50):
+        """运行一次完整的获取-入库流程，返回新增记录数"""
+        self.reset()
+        print(f"🔄 流水线获取入库（获取线程: {self.fetch_workers}，队列容量: {self.queue_size}，"
+              f"每批 {self.batch_rows} 行或 {self.batch_seconds}s 提交）...")
+
+        if self.fetch_workers > self.crawler.pool_size:
+            self.crawler.mount_pool(self.fetch_workers)
+        throttle = HostThrottle(self.host_rps)
+        host = urlparse(self.crawler.base_url).netloc
+
+        threads = [
+            threading.Thread(target=self.fetch_worker, args=(max_pages, page_size, throttle, host),
+                             name=f'fetch-{i}', daemon=True)
+            for i in range(self.fetch_workers)
+        ]
+        threads.append(threading.Thread(target=self.parse_worker, args=(page_size,), name='parse', daemon=True))
+        threads.append(threading.Thread(target=self.write_worker, name='write', daemon=True))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        # 写入全部成功且无缺口时记录已入库页面的HitCache，否则清空，下次完整遍历
+        self.crawler.commit_hit_cache(self.cache_tokens, self.walk_complete and not self.write_failed)
+
+        print(f"🎉 流水线完成，共 {self.pages_parsed} 页，{self.total_records} 条记录，新增 {self.total_inserted} 条")
+        self.show_metrics()
+        return self.total_inserted
+
+    def metrics(self):
+        """各阶段处理量、忙碌时间及队列深度"""
+        return {
+            'elapsed': self.elapsed,
+            'stages': {stage: dict(values) for stage, values in self.stage_stats.items()},
+            'commits': self.commits,
+            'queues': [self.raw_pages.stats(), self.parsed_pages.stats()],
+        }
+
+    def show_metrics(self):
+        metrics = self.metrics()
+        stages = metrics['stages']
+        print(f"📈 流水线统计（总耗时 {metrics['elapsed']:.2f}s）:")
+        print(f"   获取: {stages['fetch']['items']} 页，累计请求耗时 {stages['fetch']['busy']:.2f}s")
+        print(f"   解析: {stages['parse']['items']} 页，累计耗时 {stages['parse']['busy']:.2f}s")
+        print(f"   写入: {stages['write']['items']} 页，提交 {metrics['commits']} 次，累计耗时 {stages['write']['busy']:.2f}s")
+        for stats in metrics['queues']:
+            print(f"   队列 {stats['name']}: 最大深度 {stats['max_depth']}/{stats['capacity']}，"
+                  f"平均深度 {stats['avg_depth']:.1f}，上游阻塞 {stats['put_wait']:.2f}s，"
+                  f"下游等待 {stats['get_wait']:.2f}s")
+
+def main():
+    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    fetch_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    db_name = sys.argv[4] if len(sys.argv) > 4 else 'tdx_all_news.db'
+
+    crawler = TDXAllNewsCrawler()
+    if not crawler.init_session():
+        return 1
+    pipeline = IngestPipeline(crawler, db_name, fetch_workers=fetch_workers)
+    if pipeline.run(max_pages, page_size):
+        # 发布只读快照，API切换到新快照读取
+        conn = crawler.create_database(db_name)
+        crawler.publish_snapshot(conn, snapshot_path_for(db_name))
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
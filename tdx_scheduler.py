@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+自适应轮询调度器
+根据新公告(rec_id)的到达速率动态调整轮询间隔，并结合A股交易日历和时段配置
+"""
+
+import time
+from datetime import datetime, date
+
+# 交易日时段配置: (开始, 结束, 最短间隔秒, 最长间隔秒)
+# 未命中任何时段（夜间）及非交易日按最长间隔轮询
+DEFAULT_TIME_PROFILE = [
+    ('07:00', '09:30', 30, 300),    # 盘前
+    ('09:30', '15:30', 20, 180),    # 交易时段
+    ('15:30', '18:00', 10, 60),     # 收盘后公告披露高峰
+    ('18:00', '23:00', 60, 600),    # 晚间
+]
+
+class TradingCalendar:
+    """A股交易日历：周一至周五且不在休市日列表中"""
+    def __init__(self, holidays=()):
+        self.holidays = {self._to_date(d) for d in holidays}
+
+    @staticmethod
+    def _to_date(value):
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(value.strip(), '%Y-%m-%d').date()
+
+    @classmethod
+    def from_file(cls, path):
+        """从文件加载休市日（每行一个 YYYY-MM-DD，# 开头为注释）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+        return cls([line for line in lines if line and not line.startswith('#')])
+
+    def is_trading_day(self, day):
+        if isinstance(day, datetime):
+            day = day.date()
+        return day.weekday() < 5 and day not in self.holidays
+
+class AdaptivePollScheduler:
+    """按新数据到达速率自适应调整间隔的轮询调度器
+
+    job 每次运行返回新增记录数（失败返回 None）。调度器用指数平均估计到达速率，
+    使每次轮询预计拿到 target_batch 条新记录，并限制在 [min_interval, max_interval]
+    与当前时段配置的区间之内。
+    """
+    def __init__(self, job, min_interval=10, max_interval=600, target_batch=10,
+                 smoothing=0.3, calendar=None, profile=None):
+        self.job = job
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_batch = target_batch
+        self.smoothing = smoothing
+        self.calendar = calendar or TradingCalendar()
+        self.profile = [
+            (self._parse_time(start), self._parse_time(end), low, high)
+            for start, end, low, high in (DEFAULT_TIME_PROFILE if profile is None else profile)
+        ]
+
+        self.current_interval = min_interval
+        self.arrival_rate = 0.0     # 条/秒（指数平均）
+        self.polls = 0
+        self.hits = 0
+        self.failures = 0
+        self.last_poll = None
+
+    @staticmethod
+    def _parse_time(value):
+        return datetime.strptime(value, '%H:%M').time()
+
+    @property
+    def hit_rate(self):
+        """有新数据的轮询占比"""
+        return self.hits / self.polls if self.polls else 0.0
+
+    def interval_bounds(self, now):
+        """当前时刻允许的 (最短, 最长) 间隔"""
+        if self.calendar.is_trading_day(now):
+            current = now.time()
+            for start, end, low, high in self.profile:
+                if start <= current < end:
+                    low = max(self.min_interval, low)
+                    high = min(self.max_interval, high)
+                    return min(low, high), high
+        return self.max_interval, self.max_interval
+
+    def record(self, new_count, now=None, clock=None):
+        """记录一次轮询结果，返回下一次轮询间隔（秒）"""
+        now = now or datetime.now()
+        clock = time.monotonic() if clock is None else clock
+
+        self.polls += 1
+        if new_count is None:
+            self.failures += 1
+        else:
+            if new_count > 0:
+                self.hits += 1
+            if self.last_poll is not None:
+                elapsed = max(clock - self.last_poll, 1e-6)
+                observed = new_count / elapsed
+                self.arrival_rate = self.smoothing * observed + (1 - self.smoothing) * self.arrival_rate
+            self.last_poll = clock
+
+        if self.arrival_rate > 0:
+            interval = self.target_batch / self.arrival_rate
+        else:
+            interval = self.max_interval
+
+        low, high = self.interval_bounds(now)
+        self.current_interval = min(max(interval, low), high)
+        return self.current_interval
+
+    def stats(self):
+        """当前调度状态，用于调参"""
+        return {
+            'current_interval': round(self.current_interval, 1),
+            'arrival_rate_per_min': round(self.arrival_rate * 60, 2),
+            'hit_rate': round(self.hit_rate, 3),
+            'polls': self.polls,
+            'hits': self.hits,
+            'failures': self.failures,
+        }
+
+    def run_forever(self):
+        """循环执行任务并按自适应间隔休眠"""
+        while True:
+            interval = self.record(self.job())
+            print(f"⏱️ 下次轮询: {interval:.0f}秒后 | 到达速率: {self.arrival_rate * 60:.1f} 条/分钟 | 命中率: {self.hit_rate:.0%}")
+            time.sleep(interval)
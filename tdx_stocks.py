@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+公告标题股票实体提取
+识别标题中所有 名称(代码) 形式的股票（含全角括号及 600000.SH 这类带交易所后缀的写法），
+并按代码规则归属交易所：SH 上交所、SZ 深交所、BJ 北交所、NEEQ 全国股转系统（新三板）
+"""
+
+import re
+
+# 名称(代码) 一次匹配：名称不跨越括号、冒号、逗号、顿号、分号及空白，同一标题中的多家公司
+# 因此可分别识别。名称只从分隔符或标题开头起匹配（否定后顾）且不回吐（占有量词），
+# 不会被逐字符反复回溯
+NAME_CHARS = r'[^()（）:：,，、;；\s]'
+STOCK_PATTERN = re.compile(
+    rf'(?<!{NAME_CHARS})({NAME_CHARS}++)\s*[(（](\d{{6}})(?:\.([A-Za-z]{{2,4}}))?[)）]'
+)
+MAX_NAME_LENGTH = 40
+
+# 标题按半角右括号切出的片段（不含右括号）-> 片段中的股票。上市公司只有几千家，"名称(代码"
+# 这样的片段反复出现，常见片段很早就会进入缓存，满了之后只查不增
+SEGMENT_CACHE_LIMIT = 50_000
+_segment_cache = {}
+
+SUFFIX_EXCHANGES = {'SH': 'SH', 'SZ': 'SZ', 'BJ': 'BJ', 'NQ': 'NEEQ', 'NEEQ': 'NEEQ'}
+
+# 代码前缀 -> 交易所，按顺序匹配（长前缀在前）
+PREFIX_EXCHANGES = (
+    ('920', 'BJ'),      # 北交所新代码段
+    ('900', 'SH'),      # 沪市B股
+    ('400', 'NEEQ'),    # 两网及退市公司
+    ('420', 'NEEQ'),
+    ('43', 'BJ'),       # 北交所（原精选层）
+    ('83', 'BJ'),
+    ('87', 'BJ'),
+    ('88', 'BJ'),
+    ('11', 'SH'),       # 沪市可转债
+    ('4', 'NEEQ'),
+    ('8', 'NEEQ'),
+    ('5', 'SH'),        # 沪市基金
+    ('6', 'SH'),
+    ('0', 'SZ'),
+    ('1', 'SZ'),        # 深市基金、可转债
+    ('2', 'SZ'),        # 深市B股
+    ('3', 'SZ'),
+)
+
+def _exchange_by_prefix(prefix):
+    for head, exchange in PREFIX_EXCHANGES:
+        if prefix.startswith(head):
+            return exchange
+    return None
+
+# 前缀最长3位，预先算好所有3位前缀对应的交易所，每次匹配只需一次字典查找
+EXCHANGE_BY_PREFIX = {f'{i:03d}': _exchange_by_prefix(f'{i:03d}') for i in range(1000)}
+
+def exchange_of(code, suffix=None):
+    """返回代码所属交易所（SH/SZ/BJ/NEEQ），标题中带可识别的后缀时以后缀为准"""
+    if suffix and suffix.upper() in SUFFIX_EXCHANGES:
+        return SUFFIX_EXCHANGES[suffix.upper()]
+    return EXCHANGE_BY_PREFIX.get(code[:3])
+
+def _find_stocks(text):
+    """正则提取 text 中的股票，按出现顺序返回 ((代码, 名称, 交易所), ...)，代码去重"""
+    stocks = []
+    for name, code, suffix in STOCK_PATTERN.findall(text):
+        if all(code != existing[0] for existing in stocks):
+            stocks.append((code, name[-MAX_NAME_LENGTH:], exchange_of(code, suffix)))
+    return tuple(stocks)
+
+def _segment_stocks(segment):
+    """一个以半角右括号结尾的片段中的股票（segment 不含该右括号），结果缓存"""
+    found = _segment_cache.get(segment)
+    if found is None:
+        found = _find_stocks(segment + ')')
+        if len(_segment_cache) < SEGMENT_CACHE_LIMIT:
+            _segment_cache[segment] = found
+    return found
+
+def _merge_stocks(stocks, rest):
+    """把第一个半角右括号之后的 rest 中的股票追加到 stocks 后面，代码去重"""
+    *segments, tail = rest.split(')')
+    merged = list(stocks)
+    found = [stock for segment in segments for stock in _segment_stocks(segment)]
+    if '）' in tail:
+        found.extend(_find_stocks(tail))
+    for stock in found:
+        if all(stock[0] != existing[0] for existing in merged):
+            merged.append(stock)
+    return tuple(merged)
+
+def extract_stocks_batch(titles):
+    """批量提取，返回与 titles 一一对应的 ((代码, 名称, 交易所), ...)，同一标题内代码去重
+
+    股票总以右括号结尾、名称又不跨越括号，所以按半角右括号切开后各片段可以独立匹配、结果
+    缓存复用：单公司标题只需一次 partition 和一次字典查找，不含右括号的标题不做任何正则匹配。
+    名称过长时保留靠近代码的 MAX_NAME_LENGTH 个字符。
+    """
+    cached = _segment_cache.get
+    results = []
+    for title in titles:
+        head, close, rest = (title or '').partition(')')
+        if not close:
+            results.append(_find_stocks(head) if '）' in head else ())
+            continue
+
+        stocks = cached(head)
+        if stocks is None:
+            stocks = _segment_stocks(head)
+        if ')' in rest or '）' in rest:
+            stocks = _merge_stocks(stocks, rest)
+        results.append(stocks)
+    return results
+
+def extract_stocks(title):
+    """提取单个标题中的所有股票"""
+    return extract_stocks_batch([title])[0]
+
+def extract_stock_info(title):
+    """兼容旧接口：返回标题中第一只股票的 (代码, 名称)，没有时返回 (None, None)"""
+    stocks = extract_stocks(title)
+    if stocks:
+        return stocks[0][0], stocks[0][1]
+    return None, None